@@ -1,5 +1,7 @@
 from enum import Enum, unique
-from typing import Type, Optional, TypeVar, Protocol, NewType, Callable, Any, Sequence, Generic, Union, Set
+from typing import Type, Optional, TypeVar, Protocol, NewType, Callable, Any, Sequence, Generic, Union, Set, \
+    AsyncIterator, AsyncContextManager, Dict, Tuple, get_origin, get_args
+from functools import lru_cache
 
 from remerkleable.core import View, ObjType
 
@@ -43,13 +45,17 @@ class VariablePathSegment(Generic[_P]):
 
 class VariablePathSegmentFn(Generic[_P]):
     out_model: Any
+    # Path segment before the variable, if not empty
     name: str
     formatter: Callable[[_P], str]
+    # Name of the variable, to describe the path
+    label: str
 
-    def __init__(self, out_model: Any, name: str, formatter: Callable[[_P], str]):
+    def __init__(self, out_model: Any, name: str, formatter: Callable[[_P], str], label: Optional[str] = None):
         self.out_model = out_model
         self.name = name
         self.formatter = formatter
+        self.label = name if label is None else label
 
     def __call__(self, value: _P):
         path_segment = self.formatter(value)
@@ -58,6 +64,11 @@ class VariablePathSegmentFn(Generic[_P]):
 
 def var_path(formatter: Optional[Callable[[_P], str]] = None,
              name: Optional[str] = None) -> Callable[[Any], VariablePathSegmentFn[_P]]:
+    """
+    :param formatter: formats the value as path segment, str by default.
+    :param name: the path segment before the value, the function name by default.
+     If empty, the value directly follows the parent path, e.g. ``states/{state_id}``.
+    """
     if formatter is None:
         formatter = str  # format the input as str by default
 
@@ -69,7 +80,7 @@ def var_path(formatter: Optional[Callable[[_P], str]] = None,
                             f"Expected a 'value' input and a 'return'. But got {list(fn.__annotations__.keys())}")
         out_model = fn.__annotations__['return']
         segment_name = name if name is not None else fn.__name__
-        return VariablePathSegmentFn(out_model, segment_name, formatter)
+        return VariablePathSegmentFn(out_model, segment_name, formatter, fn.__name__)
     return deco
 
 
@@ -82,7 +93,9 @@ class APIEndpointFn(object):
     resp_type: Optional[ContentType]
     data: Optional[str]
     supports: Set[ContentType]
+    req_supports: Set[ContentType]
     call: Optional[Callable]
+    stream_call: Optional[Callable]
 
     def __init__(self, fn: Optional["APIEndpointFn"] = None):
         if fn is not None:
@@ -94,13 +107,29 @@ class APIEndpointFn(object):
             self.resp_type = fn.resp_type
             self.data = fn.data
             self.supports = fn.supports
+            self.req_supports = fn.req_supports
             self.call = fn.call
+            self.stream_call = fn.stream_call
 
     async def __call__(self, *args, **kwargs):
         if self.call is None:
             raise Exception("Eth2 API provider required to call API function.")
         return await self.call(*args, **kwargs)
 
+    def stream(self, *args, **kwargs) -> AsyncContextManager[AsyncIterator]:
+        """
+        Call the API function, but iterate the elements of the (list) response as they are received,
+        instead of waiting for and decoding the full response.
+        Returns an async context manager, the response is closed when it exits, also when iteration stops early::
+
+            async with api.beacon.validators_all.stream() as validators:
+                async for v in validators:
+                    ...
+        """
+        if self.stream_call is None:
+            raise Exception("Eth2 API provider with streaming support required to stream API function.")
+        return self.stream_call(*args, **kwargs)
+
 
 APIProviderMethodImpl = Callable
 
@@ -114,7 +143,8 @@ def api(method: Method = Method.GET,
         name: Optional[str] = None,
         req_type: Optional[ContentType] = None,
         resp_type: Optional[ContentType] = None,
-        data: Optional[str] = None) -> APIMethodDecorator:
+        data: Optional[str] = None,
+        req_supports: Optional[Set[ContentType]] = None) -> APIMethodDecorator:
     """
     :param method: The method of requesting
     :param supports: The content-types that are supported in the *response*.
@@ -123,12 +153,16 @@ def api(method: Method = Method.GET,
     :param req_type: Content type to use for the request.
     :param resp_type: Content type to use for the response.
     :param data: Optionally take one of the arguments to use as request data payload.
+    :param req_supports: The content-types that are supported in the *request*. JSON only by default:
+     declare SSZ only for endpoints that are known to accept SSZ request bodies.
     :return: a decorator to ignore the non-functional input model func for,
       and return an APIEndpointFn that actually does something.
     """
 
     if supports is None:
         supports = {ContentType.json}
+    if req_supports is None:
+        req_supports = {ContentType.json}
 
     def entry(fn):
         # The fn is dropped, we don't run any of the model functions, they are *models*, for typing.
@@ -145,7 +179,9 @@ def api(method: Method = Method.GET,
         fn.resp_type = resp_type
         fn.data = data
         fn.supports = supports
+        fn.req_supports = req_supports
         fn.call = None
+        fn.stream_call = None
         return fn
     return entry
 
@@ -155,6 +191,49 @@ class Eth2Provider(Protocol):
         ...
 
 
+def _model_class(model: Any) -> Any:
+    """The class of a route model, e.g. StateID for the parametrized generic StateID[BeaconStateAPI]"""
+    origin = get_origin(model)
+    return model if origin is None else origin
+
+
+def _type_vars(model: Any) -> Dict[Any, Any]:
+    """Maps the type variables of a generic route model, and of its generic bases, to the models they stand for."""
+    out: Dict[Any, Any] = {}
+    cls = _model_class(model)
+    if cls is not model:
+        out.update(zip(getattr(cls, '__parameters__', ()), get_args(model)))
+    for base in getattr(cls, '__orig_bases__', ()):
+        if get_origin(base) in (None, Generic, Protocol):
+            continue
+        for var, typ in _type_vars(base).items():
+            out.setdefault(var, out.get(typ, typ) if isinstance(typ, TypeVar) else typ)
+    return out
+
+
+def _substitute(typ: Any, type_vars: Dict[Any, Any]) -> Any:
+    if isinstance(typ, TypeVar):
+        return type_vars.get(typ, typ)
+    params = getattr(typ, '__parameters__', ())
+    if get_origin(typ) is not None and len(params) > 0:
+        return typ[tuple(type_vars.get(p, p) for p in params)]
+    return typ
+
+
+@lru_cache(maxsize=1024)
+def _route_info(model: Any) -> Tuple[Dict[str, Any], Dict[Any, Any]]:
+    """The sub-routes (annotations, including those of base classes) of a route model, and its type variables."""
+    cls = _model_class(model)
+    if not isinstance(cls, type):
+        return getattr(model, '__annotations__', {}), {}
+    type_vars = _type_vars(model)
+    routes: Dict[str, Any] = {}
+    for c in reversed(cls.__mro__):
+        for k, v in c.__dict__.get('__annotations__', {}).items():
+            routes[k] = _substitute(v, type_vars)
+    return routes, type_vars
+
+
 class Eth2EndpointImpl(object):
     """
     This shadows the API Model, creating endpoints on the fly, and wrapping them with the Eth2 provider as necessary.
@@ -170,22 +249,30 @@ class Eth2EndpointImpl(object):
         self.path = path
         self.model = model
 
+    def _child(self, path: APIPath, model: Any) -> "Eth2EndpointImpl":
+        return Eth2EndpointImpl(self.prov, path, model)
+
     def __getattr__(self, item):
         # If we are dealing with an opened variable path that yet needs a value, then
         if isinstance(self.model, VariablePathSegmentFn):
             raise Exception("Cannot get sub route in variable path segment, need variable first")
-        if hasattr(self.model, '__annotations__'):  # Sub routes in the model are just annotation fields
-            annotations = self.model.__annotations__
-            if item in annotations:
-                return Eth2EndpointImpl(self.prov, APIPath(self.path + '/' + item), annotations[item])
-        if hasattr(self.model, item):  # If not a sub-route, check if it's an APIEndpointFn
-            attr = getattr(self.model, item)
+        # Sub routes in the model are just annotation fields. Generic models are resolved to their parameters.
+        routes, type_vars = _route_info(self.model)
+        if item in routes:
+            return self._child(APIPath(self.path + '/' + item), routes[item])
+        cls = _model_class(self.model)
+        if hasattr(cls, item):  # If not a sub-route, check if it's an APIEndpointFn
+            attr = getattr(cls, item)
             # If it's a an API function, then wrap it with the provider, and return the resulting callable.
             if isinstance(attr, APIEndpointFn):
                 return self.prov.api_req(APIPath(self.path + '/' + attr.name))(attr)
             # If it's a variable path segment, then continue building the endpoint path
             if isinstance(attr, VariablePathSegmentFn):
-                return Eth2EndpointImpl(self.prov, APIPath(self.path + '/' + attr.name), attr)
+                if isinstance(attr.out_model, TypeVar):
+                    attr = VariablePathSegmentFn(_substitute(attr.out_model, type_vars),
+                                                 attr.name, attr.formatter, attr.label)
+                path = self.path + '/' + attr.name if attr.name != '' else self.path
+                return self._child(APIPath(path), attr)
 
         raise AttributeError(f"unknown item '{item}', not a sub-route or APIEndpointFn")
 
@@ -195,10 +282,11 @@ class Eth2EndpointImpl(object):
         # If this is a variable-path segment, then get the corresponding endpoint for the segment
         if isinstance(self.model, VariablePathSegmentFn):
             path_segment = self.model(*args, **kwargs)
-            return Eth2EndpointImpl(self.prov, APIPath(self.path + '/' + path_segment.path), path_segment.model)
+            return self._child(APIPath(self.path + '/' + path_segment.path), path_segment.model)
         # Otherwise, it may be a route that is callable itself. I.e. the model.__call__ is an APIEndpointFn
-        v = self.model.__call__
+        v = getattr(_model_class(self.model), '__call__', None)
         if isinstance(v, APIEndpointFn):
-            return self.prov.api_req(APIPath(self.path + '/' + v.name))(v)
+            # The route itself is the endpoint, call it.
+            return self.prov.api_req(self.path)(v)(*args, **kwargs)
         # It's not part of the API, maybe just a helper method in the route model. Try calling the model definition.
         return self.model(*args, **kwargs)
@@ -0,0 +1,209 @@
+from typing import Protocol, Optional, List, Dict, Set, Type, TypeVar, Callable, Iterable
+
+import json
+import hashlib
+
+from eth2spec.phase0 import spec
+from remerkleable.core import ObjType, View
+
+from eth2.core import api
+from eth2.util import FromObjProtocol
+from eth2.models.lighthouse import BeaconAPI
+
+_T = TypeVar('_T')
+
+
+class RawOperationPool(FromObjProtocol):
+    """
+    The Lighthouse ``advanced/operation_pool`` response, with the operations kept as plain JSON objects.
+    Decoding is left to the ``OperationPoolTracker``, which only decodes what it has not seen before.
+    """
+    attestations: List[ObjType]
+    attester_slashings: List[ObjType]
+    proposer_slashings: List[ObjType]
+    voluntary_exits: List[ObjType]
+
+    def __init__(self, attestations: List[ObjType], attester_slashings: List[ObjType],
+                 proposer_slashings: List[ObjType], voluntary_exits: List[ObjType]):
+        self.attestations = attestations
+        self.attester_slashings = attester_slashings
+        self.proposer_slashings = proposer_slashings
+        self.voluntary_exits = voluntary_exits
+
+    @classmethod
+    def from_obj(cls: Type[_T], obj: ObjType) -> _T:
+        if not isinstance(obj, dict):
+            raise Exception("expected dict input")
+        # Attestations are persisted grouped by attestation ID: a list of (id, attestations) pairs.
+        attestations = []
+        for entry in obj['attestations']:
+            if isinstance(entry, list):
+                attestations.extend(entry[1])
+            else:
+                attestations.append(entry)
+        return cls(attestations=attestations, attester_slashings=obj['attester_slashings'],
+                   proposer_slashings=obj['proposer_slashings'], voluntary_exits=obj['voluntary_exits'])
+
+
+class AdvancedPoolAPI(Protocol):
+
+    @api(name='operation_pool')
+    async def operation_pool(self) -> RawOperationPool: ...
+
+
+class Eth2PoolAPI(Protocol):
+    """
+    Alternative model for the Lighthouse routes used by the ``OperationPoolTracker``.
+    Use with ``extended_api(Eth2PoolAPI)``, next to the regular ``lighthouse.Eth2API``.
+    """
+    beacon: BeaconAPI
+    advanced: AdvancedPoolAPI
+
+
+class OperationsDelta(object):
+    added: List[View]
+    removed: List[spec.Root]
+
+    def __init__(self, added: List[View], removed: List[spec.Root]):
+        self.added = added
+        self.removed = removed
+
+    def __bool__(self):
+        return len(self.added) > 0 or len(self.removed) > 0
+
+
+class PoolDelta(object):
+    attestations: OperationsDelta
+    attester_slashings: OperationsDelta
+    proposer_slashings: OperationsDelta
+    voluntary_exits: OperationsDelta
+
+    def __init__(self, attestations: OperationsDelta, attester_slashings: OperationsDelta,
+                 proposer_slashings: OperationsDelta, voluntary_exits: OperationsDelta):
+        self.attestations = attestations
+        self.attester_slashings = attester_slashings
+        self.proposer_slashings = proposer_slashings
+        self.voluntary_exits = voluntary_exits
+
+    def __bool__(self):
+        return bool(self.attestations or self.attester_slashings or self.proposer_slashings or self.voluntary_exits)
+
+
+def _raw_key(obj: ObjType) -> bytes:
+    # Canonical JSON, hashed. Much cheaper than decoding and merkleizing the operation.
+    return hashlib.blake2b(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode(), digest_size=16).digest()
+
+
+class _OperationIndex(object):
+    typ: Type[View]
+    # Raw key -> hash-tree-root, and hash-tree-root -> operation
+    by_key: Dict[bytes, spec.Root]
+    by_root: Dict[spec.Root, View]
+    # The same operation may be listed in different forms, count the keys per root.
+    refs: Dict[spec.Root, int]
+    # Raw keys of operations that are still in the pool, but no longer relevant. Decoded once, never again.
+    pruned: Set[bytes]
+
+    def __init__(self, typ: Type[View]):
+        self.typ = typ
+        self.by_key = {}
+        self.by_root = {}
+        self.refs = {}
+        self.pruned = set()
+
+    def _drop(self, key: bytes, removed: List[spec.Root]):
+        root = self.by_key.pop(key)
+        self.refs[root] -= 1
+        if self.refs[root] == 0:
+            del self.refs[root]
+            del self.by_root[root]
+            removed.append(root)
+
+    def update(self, raw_ops: Iterable[ObjType], is_stale: Callable[[View], bool], recheck: bool) -> OperationsDelta:
+        added: List[View] = []
+        removed: List[spec.Root] = []
+        present: Set[bytes] = set()
+        for raw in raw_ops:
+            key = _raw_key(raw)
+            present.add(key)
+            if key in self.by_key or key in self.pruned:
+                continue
+            op = self.typ.from_obj(raw)
+            if is_stale(op):
+                self.pruned.add(key)
+                continue
+            root = op.hash_tree_root()
+            self.by_key[key] = root
+            self.refs[root] = self.refs.get(root, 0) + 1
+            if root not in self.by_root:
+                self.by_root[root] = op
+                added.append(op)
+
+        for key in [k for k in self.by_key.keys() if k not in present]:
+            self._drop(key, removed)
+        self.pruned &= present
+
+        # Finality advanced: tracked operations may have become irrelevant
+        if recheck:
+            for key, root in list(self.by_key.items()):
+                if root in self.by_root and is_stale(self.by_root[root]):
+                    self.pruned.add(key)
+                    self._drop(key, removed)
+        return OperationsDelta(added=added, removed=removed)
+
+
+class OperationPoolTracker(object):
+    """
+    Tracks the operation pool of a node over repeated polls, and reports only the changes.
+
+    Operations are indexed by their hash-tree-root, and by a hash of their JSON form to skip decoding
+    operations that were seen before. Attestations that target an epoch before the finalized epoch
+    are pruned: they can no longer be included, so they are not reported nor kept in memory.
+    """
+    finalized_epoch: Optional[spec.Epoch]
+    _attestations: _OperationIndex
+    _attester_slashings: _OperationIndex
+    _proposer_slashings: _OperationIndex
+    _voluntary_exits: _OperationIndex
+
+    def __init__(self):
+        self.finalized_epoch = None
+        self._attestations = _OperationIndex(spec.Attestation)
+        self._attester_slashings = _OperationIndex(spec.AttesterSlashing)
+        self._proposer_slashings = _OperationIndex(spec.ProposerSlashing)
+        self._voluntary_exits = _OperationIndex(spec.SignedVoluntaryExit)
+
+    def _is_stale_attestation(self, att: spec.Attestation) -> bool:
+        return self.finalized_epoch is not None and att.data.target.epoch < self.finalized_epoch
+
+    def update(self, pool: RawOperationPool, finalized_epoch: Optional[spec.Epoch] = None) -> PoolDelta:
+        recheck = finalized_epoch is not None and finalized_epoch != self.finalized_epoch
+        if finalized_epoch is not None:
+            self.finalized_epoch = finalized_epoch
+
+        def never_stale(op: View) -> bool:
+            return False
+
+        return PoolDelta(
+            attestations=self._attestations.update(pool.attestations, self._is_stale_attestation, recheck),
+            attester_slashings=self._attester_slashings.update(pool.attester_slashings, never_stale, False),
+            proposer_slashings=self._proposer_slashings.update(pool.proposer_slashings, never_stale, False),
+            voluntary_exits=self._voluntary_exits.update(pool.voluntary_exits, never_stale, False),
+        )
+
+    async def poll(self, pool_api: Eth2PoolAPI) -> PoolDelta:
+        head = await pool_api.beacon.head()
+        pool = await pool_api.advanced.operation_pool()
+        return self.update(pool, spec.Epoch(head.finalized_slot // spec.SLOTS_PER_EPOCH))
+
+    def attestations(self) -> List[spec.Attestation]:
+        return list(self._attestations.by_root.values())
+
+    def attester_slashings(self) -> List[spec.AttesterSlashing]:
+        return list(self._attester_slashings.by_root.values())
+
+    def proposer_slashings(self) -> List[spec.ProposerSlashing]:
+        return list(self._proposer_slashings.by_root.values())
+
+    def voluntary_exits(self) -> List[spec.SignedVoluntaryExit]:
+        return list(self._voluntary_exits.by_root.values())
@@ -0,0 +1,102 @@
+from typing import Optional, List, Tuple, Callable, Awaitable, Any
+
+import trio
+
+from eth2spec.phase0 import spec
+
+from eth2.models.lighthouse import Eth2API, HeadInfo
+from eth2.providers.cache import fresh_for
+
+
+class PrefetchStats(object):
+    heads: int
+    fetched: int
+    failed: int
+    skipped: int
+
+    def __init__(self):
+        self.heads = 0
+        self.fetched = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return f"PrefetchStats(heads={self.heads}, fetched={self.fetched}, failed={self.failed}, skipped={self.skipped})"
+
+
+class HeadPrefetcher(object):
+    """
+    Watches ``beacon.head``, and when it moves, fetches in the background what pipelines are about to ask for:
+    the new head block and, near an epoch boundary, the committees of the next epoch and the fork.
+
+    Results go into the response cache of the provider, and stay fresh for ``ttl`` seconds:
+    the same calls made by the pipeline within that time return instantly, or join the prefetch if still in flight.
+    Requires a provider with a ``response_cache`` that caches the prefetched paths, like the default one does.
+    """
+    api: Eth2API
+    # Maximum number of prefetch requests per head change, and how many of those may run concurrently
+    budget: int
+    concurrency: int
+    ttl: float
+    poll_interval: float
+    # Prefetch the next epoch when the head is within this many slots of the epoch boundary
+    epoch_margin: int
+    last_head: Optional[HeadInfo]
+    stats: PrefetchStats
+
+    def __init__(self, api: Eth2API, budget: int = 3, concurrency: int = 2, ttl: float = 12.0,
+                 poll_interval: float = 1.0, epoch_margin: int = 2):
+        self.api = api
+        self.budget = budget
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.epoch_margin = epoch_margin
+        self.last_head = None
+        self.stats = PrefetchStats()
+
+    def plan(self, head: HeadInfo) -> List[Tuple[Callable[..., Awaitable[Any]], dict]]:
+        """The calls to prefetch for the given head, most important first."""
+        calls: List[Tuple[Callable[..., Awaitable[Any]], dict]] = [(self.api.beacon.block, {'root': head.block_root})]
+        epoch = head.slot // spec.SLOTS_PER_EPOCH
+        if spec.SLOTS_PER_EPOCH - head.slot % spec.SLOTS_PER_EPOCH <= self.epoch_margin:
+            calls.append((self.api.beacon.committees, {'epoch': spec.Epoch(epoch + 1)}))
+            calls.append((self.api.beacon.fork, {}))
+        return calls
+
+    async def _worker(self, calls: List[Tuple[Callable[..., Awaitable[Any]], dict]]):
+        # Workers share the list of calls, so the most important calls start first.
+        while len(calls) > 0:
+            fn, kwargs = calls.pop(0)
+            try:
+                await fn(**kwargs)
+                self.stats.fetched += 1
+            except Exception:
+                # Best effort: the pipeline will just fetch it itself.
+                self.stats.failed += 1
+
+    async def on_head(self, head: HeadInfo):
+        self.stats.heads += 1
+        calls = self.plan(head)
+        self.stats.skipped += max(0, len(calls) - self.budget)
+        calls = calls[:self.budget]
+        with fresh_for(self.ttl):
+            async with trio.open_nursery() as nursery:
+                for _ in range(min(self.concurrency, len(calls))):
+                    nursery.start_soon(self._worker, calls)
+
+    async def poll(self):
+        """Check the head once, and prefetch if it moved."""
+        head = await self.api.beacon.head()
+        if self.last_head is None or head.block_root != self.last_head.block_root:
+            self.last_head = head
+            await self.on_head(head)
+
+    async def run(self):
+        """Poll the head every poll_interval seconds, until cancelled. Run this in a nursery."""
+        while True:
+            try:
+                await self.poll()
+            except Exception:
+                pass  # Temporary node errors should not stop prefetching
+            await trio.sleep(self.poll_interval)
@@ -0,0 +1,193 @@
+from typing import Protocol, Optional, List, Dict, Type, TypeVar
+
+import numpy as np
+
+from eth2spec.phase0 import spec
+from remerkleable.core import ObjType
+
+from eth2.core import api, Method
+from eth2.util import FromObjProtocol, ObjStruct, ObjList
+from eth2.models.lighthouse import GlobalVotes, VoteInfo, VoteQuery, Shuffling
+
+# The boolean flags of a vote, in model order. Each becomes one boolean array.
+VOTE_FLAGS = tuple(k for k, t in VoteInfo.__annotations__.items() if t is bool)
+
+_T = TypeVar('_T')
+
+
+class CommitteeParticipation(ObjStruct):
+    slot: spec.Slot
+    index: spec.CommitteeIndex
+    size: int
+    active_gwei: int
+    attesting_gwei: int
+    target_attesting_gwei: int
+    head_attesting_gwei: int
+
+
+class VoteArrays(FromObjProtocol):
+    """
+    Column-oriented decoding of the Lighthouse ``consensus/individual_votes`` response.
+
+    Instead of a ``VoteEntry`` object per validator, every vote field is a NumPy array,
+    sorted by validator index. Entries without a vote (unknown pubkeys) are dropped.
+    """
+    epoch: Optional[int]
+    pubkeys: List[str]
+    validator_index: np.ndarray
+    current_epoch_effective_balance_gwei: np.ndarray
+    is_slashed: np.ndarray
+    is_withdrawable_in_current_epoch: np.ndarray
+    is_active_in_current_epoch: np.ndarray
+    is_active_in_previous_epoch: np.ndarray
+    is_current_epoch_attester: np.ndarray
+    is_current_epoch_target_attester: np.ndarray
+    is_previous_epoch_attester: np.ndarray
+    is_previous_epoch_target_attester: np.ndarray
+    is_previous_epoch_head_attester: np.ndarray
+
+    def __init__(self, epoch: Optional[int], pubkeys: List[str], validator_index: np.ndarray,
+                 current_epoch_effective_balance_gwei: np.ndarray, flags: Dict[str, np.ndarray]):
+        self.epoch = epoch
+        self.pubkeys = pubkeys
+        self.validator_index = validator_index
+        self.current_epoch_effective_balance_gwei = current_epoch_effective_balance_gwei
+        for k in VOTE_FLAGS:
+            setattr(self, k, flags[k])
+
+    @classmethod
+    def from_obj(cls: Type[_T], obj: ObjType) -> _T:
+        if not isinstance(obj, list):
+            raise Exception("expected list input")
+        entries = [e for e in obj if e.get('vote') is not None]
+        n = len(entries)
+        votes = [e['vote'] for e in entries]
+        indices = np.fromiter((e['validator_index'] for e in entries), dtype=np.uint64, count=n)
+        balances = np.fromiter((v['current_epoch_effective_balance_gwei'] for v in votes), dtype=np.uint64, count=n)
+        flags = {k: np.fromiter((v[k] for v in votes), dtype=np.bool_, count=n) for k in VOTE_FLAGS}
+
+        # Sort everything by validator index, so lookups can use a binary search
+        order = np.argsort(indices, kind='stable')
+        return cls(
+            epoch=int(entries[0]['epoch']) if n > 0 else None,
+            pubkeys=[entries[i]['pubkey'] for i in order],
+            validator_index=indices[order],
+            current_epoch_effective_balance_gwei=balances[order],
+            flags={k: f[order] for k, f in flags.items()},
+        )
+
+    def __len__(self):
+        return len(self.validator_index)
+
+    def positions(self, validator_indices: np.ndarray) -> np.ndarray:
+        """
+        :param validator_indices: validator indices to look up.
+        :return: the array positions of the given validators, -1 where the validator is not part of the votes.
+        """
+        validator_indices = np.asarray(validator_indices, dtype=np.uint64)
+        if len(self) == 0:
+            return np.full(len(validator_indices), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.validator_index, validator_indices), len(self) - 1)
+        return np.where(self.validator_index[pos] == validator_indices, pos, -1)
+
+    def flag_bits(self, flag: str, registry_size: Optional[int] = None) -> np.ndarray:
+        """
+        :param flag: one of the vote flags, e.g. ``is_previous_epoch_target_attester``.
+        :param registry_size: the number of bits, defaults to the highest validator index + 1.
+        :return: a boolean array indexed by validator index.
+        """
+        if flag not in VOTE_FLAGS:
+            raise Exception(f"unknown vote flag '{flag}'")
+        if registry_size is None:
+            registry_size = int(self.validator_index[-1]) + 1 if len(self) > 0 else 0
+        bits = np.zeros(registry_size, dtype=np.bool_)
+        bits[self.validator_index] = getattr(self, flag)
+        return bits
+
+    def bitset(self, flag: str, registry_size: Optional[int] = None) -> bytes:
+        """
+        Like ``flag_bits``, but packed into bytes, little-endian bit order like SSZ bitfields.
+        """
+        return np.packbits(self.flag_bits(flag, registry_size), bitorder='little').tobytes()
+
+    def gwei(self, mask: np.ndarray) -> int:
+        """Sum of the effective balances of the validators selected by the mask."""
+        return int(self.current_epoch_effective_balance_gwei[mask].sum(dtype=np.uint64))
+
+    def global_votes(self) -> GlobalVotes:
+        """
+        Aggregates the individual votes in the same way Lighthouse computes ``consensus/global_votes``.
+        Only equal to the global votes if all validators were queried.
+        """
+        unslashed = ~self.is_slashed
+        return GlobalVotes(
+            current_epoch_active_gwei=self.gwei(self.is_active_in_current_epoch),
+            previous_epoch_active_gwei=self.gwei(self.is_active_in_previous_epoch),
+            current_epoch_attesting_gwei=self.gwei(unslashed & self.is_current_epoch_attester),
+            current_epoch_target_attesting_gwei=self.gwei(unslashed & self.is_current_epoch_target_attester),
+            previous_epoch_attesting_gwei=self.gwei(unslashed & self.is_previous_epoch_attester),
+            previous_epoch_target_attesting_gwei=self.gwei(unslashed & self.is_previous_epoch_target_attester),
+            previous_epoch_head_attesting_gwei=self.gwei(unslashed & self.is_previous_epoch_head_attester),
+        )
+
+    def current_epoch_target_rate(self) -> float:
+        return _rate(self.gwei(~self.is_slashed & self.is_current_epoch_target_attester),
+                     self.gwei(self.is_active_in_current_epoch))
+
+    def previous_epoch_target_rate(self) -> float:
+        return _rate(self.gwei(~self.is_slashed & self.is_previous_epoch_target_attester),
+                     self.gwei(self.is_active_in_previous_epoch))
+
+    def previous_epoch_head_rate(self) -> float:
+        return _rate(self.gwei(~self.is_slashed & self.is_previous_epoch_head_attester),
+                     self.gwei(self.is_active_in_previous_epoch))
+
+    def previous_epoch_committees(self, shuffling: Shuffling) -> ObjList[CommitteeParticipation]:
+        """
+        Break down the previous-epoch participation per committee.
+        :param shuffling: the committees of the previous epoch, i.e. ``beacon.committees(epoch - 1)``.
+        :return: participation per committee. Validators that were not part of the vote query do not count.
+        """
+        sizes = np.fromiter((len(c.committee) for c in shuffling), dtype=np.int64, count=len(shuffling))
+        members = np.fromiter((int(v) for c in shuffling for v in c.committee), dtype=np.uint64, count=int(sizes.sum()))
+        committee_ids = np.repeat(np.arange(len(shuffling)), sizes)
+
+        pos = self.positions(members)
+        known = pos >= 0
+        pos, committee_ids = pos[known], committee_ids[known]
+        balances = self.current_epoch_effective_balance_gwei[pos]
+        unslashed = ~self.is_slashed[pos]
+
+        def per_committee(mask: np.ndarray) -> np.ndarray:
+            out = np.zeros(len(shuffling), dtype=np.uint64)
+            np.add.at(out, committee_ids[mask], balances[mask])
+            return out
+
+        active = per_committee(self.is_active_in_previous_epoch[pos])
+        attesting = per_committee(unslashed & self.is_previous_epoch_attester[pos])
+        target = per_committee(unslashed & self.is_previous_epoch_target_attester[pos])
+        head = per_committee(unslashed & self.is_previous_epoch_head_attester[pos])
+        return ObjList[CommitteeParticipation]([
+            CommitteeParticipation(
+                slot=c.slot, index=c.index, size=int(sizes[i]),
+                active_gwei=int(active[i]), attesting_gwei=int(attesting[i]),
+                target_attesting_gwei=int(target[i]), head_attesting_gwei=int(head[i]))
+            for i, c in enumerate(shuffling)])
+
+
+def _rate(part: int, total: int) -> float:
+    return part / total if total > 0 else 0.0
+
+
+class ConsensusVotesAPI(Protocol):
+
+    @api(method=Method.POST, data='query', name='individual_votes')
+    async def individual_votes(self, query: VoteQuery) -> VoteArrays: ...
+
+
+class Eth2VotesAPI(Protocol):
+    """
+    Alternative model for the Lighthouse consensus routes, decoding votes into arrays.
+    Use with ``extended_api(Eth2VotesAPI)``, next to the regular ``lighthouse.Eth2API``.
+    """
+    consensus: ConsensusVotesAPI
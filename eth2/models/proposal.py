@@ -1,10 +1,57 @@
 from enum import Enum
-from typing import TypeVar, Protocol, List, Union, Sequence
+from typing import TypeVar, Protocol, Optional, Type, Union, Any
 
-from eth2.core import FromObjProtocol, var_path, api
+from eth2.core import var_path, api
+from eth2.util import FromObjProtocol, ObjStruct, ObjList, _json_loader
 from eth2spec.phase0 import spec
 
 K = TypeVar('K')
+_T = TypeVar('_T')
+
+
+class Data(FromObjProtocol):
+    """
+    Responses of the standard API wrap the result in a "data" field. ``Data[T]`` decodes to the wrapped ``T``.
+    """
+    data_class: Type
+
+    def __class_getitem__(cls, item: Type[_T]):
+        class TypedData(cls):
+            pass
+        setattr(TypedData, 'data_class', item)
+        return TypedData
+
+    @classmethod
+    def from_obj(cls, obj: Any) -> Any:
+        if not isinstance(obj, dict) or 'data' not in obj:
+            raise Exception("expected a data wrapper")
+        return _json_loader(cls.data_class, obj['data'])
+
+
+def format_id(value: Union[str, int, bytes]) -> str:
+    """Formats a state or block ID: a name like 'head' as-is, a slot as number, and a root as hex."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    return str(int(value))
+
+
+ValidatorIdType = Union[spec.ValidatorIndex, spec.BLSPubkey, int, str]
+
+
+def validator_id(value: ValidatorIdType) -> str:
+    """Formats a validator index or pubkey as validator ID. Equal validator IDs are formatted the same."""
+    if isinstance(value, str):
+        return value.lower() if value.startswith('0x') else str(int(value))
+    return format_id(value)
+
+
+class ValidatorIDs(list):
+    """Validator indices and/or pubkeys, to query multiple validators at once. Encoded as comma-separated list."""
+
+    def to_obj(self) -> str:
+        return ','.join(map(validator_id, self))
 
 
 class StateID(Protocol[K]):
@@ -14,49 +61,108 @@ class StateID(Protocol[K]):
     justified: K
     genesis: K
 
-    @var_path()
+    @var_path(formatter=format_id, name='')
     def state_root(self, value: spec.Root) -> K:
         ...
 
-    @var_path()
+    @var_path(formatter=format_id, name='')
+    def slot(self, value: spec.Slot) -> K:
+        ...
+
+    @var_path(formatter=format_id, name='')
+    def id(self, value: Union[str, int, bytes]) -> K:
+        ...
+
+
+class BlockID(Protocol[K]):
+
+    head: K
+    finalized: K
+    genesis: K
+
+    @var_path(formatter=format_id, name='')
+    def root(self, value: spec.Root) -> K:
+        ...
+
+    @var_path(formatter=format_id, name='')
     def slot(self, value: spec.Slot) -> K:
         ...
 
+    @var_path(formatter=format_id, name='')
+    def id(self, value: Union[str, int, bytes]) -> K:
+        ...
+
 
 class ValidatorID(Protocol[K]):
 
-    @var_path()
+    @var_path(formatter=validator_id, name='')
     def pubkey(self, value: spec.BLSPubkey) -> K:
         ...
 
-    @var_path()
+    @var_path(formatter=validator_id, name='')
     def index(self, value: spec.ValidatorIndex) -> K:
         ...
 
 
 class ValidatorStatus(Enum):
-    slashed = "slashed"
-    activation_queue = "activation_queue"
-    active = "active"
-    exit_queue = "exit_queue"
-    exited = "exited"
-    withdrawable = "withdrawable"
+    pending_initialized = "pending_initialized"
+    pending_queued = "pending_queued"
+    active_ongoing = "active_ongoing"
+    active_exiting = "active_exiting"
+    active_slashed = "active_slashed"
+    exited_unslashed = "exited_unslashed"
+    exited_slashed = "exited_slashed"
+    withdrawal_possible = "withdrawal_possible"
+    withdrawal_done = "withdrawal_done"
 
 
-class ValidatorInfo(FromObjProtocol):
-    validator: spec.Validator
+class Genesis(ObjStruct):
+    genesis_time: spec.uint64
+    genesis_validators_root: spec.Root
+    genesis_fork_version: spec.Version
+
+
+class RootData(ObjStruct):
+    root: spec.Root
+
+
+class FinalityCheckpoints(ObjStruct):
+    previous_justified: spec.Checkpoint
+    current_justified: spec.Checkpoint
+    finalized: spec.Checkpoint
+
+
+class ValidatorInfo(ObjStruct):
+    index: spec.ValidatorIndex
+    balance: spec.Gwei
     status: ValidatorStatus
+    validator: spec.Validator
+
+
+ValidatorInfoList = ObjList[ValidatorInfo]
+
+
+class ValidatorBalance(ObjStruct):
+    index: spec.ValidatorIndex
     balance: spec.Gwei
 
 
-class ValidatorInfoList(List[ValidatorInfo], FromObjProtocol):
-    pass
+class Committee(ObjStruct):
+    index: spec.CommitteeIndex
+    slot: spec.Slot
+    validators: ObjList[spec.ValidatorIndex]
+
+
+class BlockHeaderInfo(ObjStruct):
+    root: spec.Root
+    canonical: bool
+    header: spec.SignedBeaconBlockHeader
 
 
 class BeaconStateValidatorAPI(Protocol):
 
     @api()
-    async def __call__(self) -> ValidatorInfo:
+    async def __call__(self) -> Data[ValidatorInfo]:
         ...
 
 
@@ -64,26 +170,93 @@ class BeaconStateValidatorAPI(Protocol):
 class BeaconStateValidatorsAPI(ValidatorID[BeaconStateValidatorAPI], Protocol):
 
     @api()
-    async def __call__(self,
-                       validator_ids: Union[Sequence[spec.ValidatorIndex], Sequence[spec.BLSPubkey]]
-                       ) -> ValidatorInfoList:  # TODO spec is inconsistent with casing
+    async def __call__(self, id: Optional[ValidatorIDs] = None,
+                       status: Optional[str] = None) -> Data[ValidatorInfoList]:
+        """
+        :param id: the validators to get, all validators if None.
+         See eth2.models.proposal_validators for batched lookups of many validators.
+        :param status: comma-separated validator statuses to filter by.
+        """
         ...
 
 
 class BeaconStateAPI(Protocol):
 
+    validators: BeaconStateValidatorsAPI
+
     @api()
-    async def root(self) -> spec.Root:
-        pass
+    async def root(self) -> Data[RootData]:
+        ...
 
     @api()
-    async def fork(self) -> spec.Fork:
-        pass
+    async def fork(self) -> Data[spec.Fork]:
+        ...
+
+    @api()
+    async def finality_checkpoints(self) -> Data[FinalityCheckpoints]:
+        ...
+
+    @api()
+    async def validator_balances(self, id: Optional[ValidatorIDs] = None) -> Data[ObjList[ValidatorBalance]]:
+        ...
+
+    @api()
+    async def committees(self, epoch: Optional[spec.Epoch] = None, index: Optional[spec.CommitteeIndex] = None,
+                         slot: Optional[spec.Slot] = None) -> Data[ObjList[Committee]]:
+        ...
+
+
+class BeaconHeaderAPI(Protocol):
+
+    @api()
+    async def __call__(self) -> Data[BlockHeaderInfo]:
+        ...
+
+
+class BeaconHeadersAPI(BlockID[BeaconHeaderAPI], Protocol):
+
+    @api()
+    async def __call__(self, slot: Optional[spec.Slot] = None,
+                       parent_root: Optional[spec.Root] = None) -> Data[ObjList[BlockHeaderInfo]]:
+        ...
+
+
+class BeaconBlockAPI(Protocol):
+
+    @api()
+    async def __call__(self) -> Data[spec.SignedBeaconBlock]:
+        ...
+
+    @api()
+    async def root(self) -> Data[RootData]:
+        ...
+
+    @api()
+    async def attestations(self) -> Data[ObjList[spec.Attestation]]:
+        ...
 
 
 class BeaconAPI(Protocol):
 
     states: StateID[BeaconStateAPI]
+    headers: BeaconHeadersAPI
+    blocks: BlockID[BeaconBlockAPI]
+
+    @api()
+    async def genesis(self) -> Data[Genesis]:
+        ...
+
+
+class V1API(Protocol):
+    beacon: BeaconAPI
+
+
+class EthAPI(Protocol):
+    v1: V1API
 
 
-# TODO: many more methods are missing. Update API to match latest API proposal
+class Eth2API(Protocol):
+    """
+    The standard Eth2 beacon node API, e.g. ``api.eth.v1.beacon.states.head.finality_checkpoints()``.
+    """
+    eth: EthAPI
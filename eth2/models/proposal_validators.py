@@ -0,0 +1,130 @@
+from typing import Optional, List, Dict, Tuple, Sequence, Any, Union
+
+import trio
+
+from eth2spec.phase0 import spec
+
+from eth2.models.proposal import Eth2API, ValidatorInfo, ValidatorIDs, ValidatorIdType, format_id, validator_id
+
+
+class _Batch(object):
+    # Distinct validator IDs, in order
+    ids: Dict[str, None]
+    results: Dict[str, Any]
+    error: Optional[Exception]
+    done: trio.Event
+
+    def __init__(self, ids: Sequence[str]):
+        self.ids = dict.fromkeys(ids)
+        self.results = {}
+        self.error = None
+        self.done = trio.Event()
+
+
+class ValidatorBatcher(object):
+    """
+    Looks up validators, or their balances, by index or pubkey, with the multi-ID queries of the standard API.
+
+    IDs are de-duplicated, and split up into requests of at most max_ids IDs, which run concurrently.
+    Lookups on the same state that start at the same time (within the window) are merged into one batch.
+    A lookup costs in proportion to the number of distinct validators, not to the size of the registry.
+    """
+    api: Eth2API
+    max_ids: int
+    concurrency: int
+    # Seconds to wait for other lookups to join a batch. Zero still merges the lookups started in the same tick.
+    window: float
+    _open: Dict[Tuple[str, str], _Batch]
+
+    def __init__(self, api: Eth2API, max_ids: int = 30, concurrency: int = 4, window: float = 0.0):
+        self.api = api
+        self.max_ids = max_ids
+        self.concurrency = concurrency
+        self.window = window
+        self._open = {}
+
+    async def validators(self, state_id: Union[str, int, bytes],
+                         ids: Sequence[ValidatorIdType]) -> List[Optional[ValidatorInfo]]:
+        """
+        :param state_id: the state to look up the validators in, e.g. 'head', a slot or a state root.
+        :param ids: validator indices and/or pubkeys.
+        :return: the validators, in the same order as the IDs, None for unknown validators.
+        """
+        keys = [validator_id(v) for v in ids]
+        found = await self._lookup('validators', format_id(state_id), keys)
+        return [found.get(k) for k in keys]
+
+    async def balances(self, state_id: Union[str, int, bytes],
+                       ids: Sequence[ValidatorIdType]) -> List[Optional[spec.Gwei]]:
+        """
+        :param state_id: the state to look up the balances in, e.g. 'head', a slot or a state root.
+        :param ids: validator indices and/or pubkeys.
+        :return: the balances, in the same order as the IDs, None for unknown validators.
+        """
+        keys = [validator_id(v) for v in ids]
+        state = format_id(state_id)
+        found: Dict[str, spec.Gwei] = {}
+
+        # Balances are identified by index only: pubkeys are looked up with the validators instead.
+        async def by_index():
+            indices = [k for k in keys if not k.startswith('0x')]
+            for k, v in (await self._lookup('validator_balances', state, indices)).items():
+                found[k] = v.balance
+
+        async def by_pubkey():
+            pubkeys = [k for k in keys if k.startswith('0x')]
+            for k, v in (await self._lookup('validators', state, pubkeys)).items():
+                found[k] = v.balance
+
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(by_index)
+            nursery.start_soon(by_pubkey)
+        return [found.get(k) for k in keys]
+
+    async def _lookup(self, kind: str, state_id: str, keys: Sequence[str]) -> Dict[str, Any]:
+        if len(keys) == 0:
+            return {}
+        batch_key = (kind, state_id)
+        batch = self._open.get(batch_key)
+        if batch is not None:
+            # Join the batch that is still being collected
+            batch.ids.update(dict.fromkeys(keys))
+            await batch.done.wait()
+            if batch.error is not None:
+                raise Exception("batched validator lookup failed") from batch.error
+            return batch.results
+
+        batch = _Batch(keys)
+        self._open[batch_key] = batch
+        try:
+            # Give the lookups that start at the same time a chance to join
+            await trio.sleep(self.window)
+            del self._open[batch_key]
+            await self._fetch(kind, state_id, batch)
+        except BaseException as e:
+            batch.error = e if isinstance(e, Exception) else Exception("batched validator lookup was cancelled")
+            raise
+        finally:
+            if self._open.get(batch_key) is batch:
+                del self._open[batch_key]
+            batch.done.set()
+        return batch.results
+
+    async def _fetch(self, kind: str, state_id: str, batch: _Batch):
+        ids = list(batch.ids.keys())
+        state = self.api.eth.v1.beacon.states.id(state_id)
+        limiter = trio.CapacityLimiter(self.concurrency)
+
+        async def fetch(chunk: List[str]):
+            async with limiter:
+                if kind == 'validators':
+                    for info in await state.validators(id=ValidatorIDs(chunk)):
+                        batch.results[validator_id(info.index)] = info
+                        batch.results[validator_id(info.validator.pubkey)] = info
+                else:
+                    for balance in await state.validator_balances(id=ValidatorIDs(chunk)):
+                        batch.results[validator_id(balance.index)] = balance
+
+        async with trio.open_nursery() as nursery:
+            for i in range(0, len(ids), self.max_ids):
+                nursery.start_soon(fetch, ids[i:i + self.max_ids])
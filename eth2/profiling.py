@@ -0,0 +1,174 @@
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from time import perf_counter_ns
+
+import threading
+
+from eth2.core import APIEndpointFn, APIPath, Eth2EndpointImpl, Eth2Provider, VariablePathSegmentFn, _model_class
+
+# The phases of a request, in order:
+#  resolve: Eth2EndpointImpl route lookups, i.e. the attribute accesses and calls to get to the endpoint
+#  bind: argument binding and headers
+#  encode: request body and query parameters
+#  queue: waiting for the adaptive limiter, if any
+#  http: sending the request and receiving the response (httpx)
+#  json: parsing the JSON response
+#  from_obj: converting the parsed JSON into the response type (from_obj / _json_loader)
+#  ssz: SSZ decoding with remerkleable (including root verification, if any)
+#  verify: JSON conversion and root verification of rooted JSON responses (instead of from_obj)
+PHASES = ('resolve', 'bind', 'encode', 'queue', 'http', 'json', 'from_obj', 'ssz', 'verify')
+
+
+class PhaseStats(object):
+    endpoint: str
+    phase: str
+    count: int
+    total_ns: int
+    max_ns: int
+
+    def __init__(self, endpoint: str, phase: str, count: int = 0, total_ns: int = 0, max_ns: int = 0):
+        self.endpoint = endpoint
+        self.phase = phase
+        self.count = count
+        self.total_ns = total_ns
+        self.max_ns = max_ns
+
+    def __repr__(self):
+        return f"PhaseStats({self.endpoint}, {self.phase}, count={self.count}, " \
+               f"total_ns={self.total_ns}, max_ns={self.max_ns})"
+
+
+class Profiler(object):
+    """
+    Counts the time spent in each phase of the client stack (see PHASES), per endpoint.
+    Counting is cheap: a clock read and a counter update per phase, no sampling thread or tracing.
+
+    Times are wall-clock. With many concurrent requests, the awaiting phases (queue, http)
+    include the time spent in other tasks, while the CPU-bound phases do not.
+    Endpoints with variable path segments are named by their template, e.g. ``/beacon/states/slot/{slot}``.
+
+    Thread-safe: routes of the sync client (eth2.providers.sync) are resolved in the calling threads,
+    while its requests are counted on the background loop.
+    """
+    _counters: Dict[Tuple[Hashable, str], PhaseStats]
+    _labels: Dict[Hashable, str]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._counters = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def now() -> int:
+        return perf_counter_ns()
+
+    def label(self, key: Hashable, endpoint: str) -> None:
+        """Name the endpoint of a key. The first name sticks."""
+        if key not in self._labels:
+            with self._lock:
+                self._labels.setdefault(key, endpoint)
+
+    def add(self, key: Hashable, phase: str, start: int) -> int:
+        """
+        Count the time since start for the given phase.
+        :return: the current time, to start timing the next phase with.
+        """
+        now = perf_counter_ns()
+        elapsed = now - start
+        with self._lock:
+            counter = self._counters.get((key, phase))
+            if counter is None:
+                counter = self._counters[(key, phase)] = PhaseStats('', phase)
+            counter.count += 1
+            counter.total_ns += elapsed
+            if elapsed > counter.max_ns:
+                counter.max_ns = elapsed
+        return now
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+    def stats(self) -> List[PhaseStats]:
+        """The counters, merged per endpoint and phase, ordered by endpoint and then by phase."""
+        merged: Dict[Tuple[str, str], PhaseStats] = {}
+        with self._lock:
+            for (key, phase), counter in self._counters.items():
+                endpoint = self._labels.get(key, str(key))
+                out = merged.get((endpoint, phase))
+                if out is None:
+                    out = merged[(endpoint, phase)] = PhaseStats(endpoint, phase)
+                out.count += counter.count
+                out.total_ns += counter.total_ns
+                out.max_ns = max(out.max_ns, counter.max_ns)
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        return sorted(merged.values(), key=lambda st: (st.endpoint, order.get(st.phase, len(PHASES)), st.phase))
+
+    def table(self) -> str:
+        """The breakdown as a text table, with the share of each phase in the total time."""
+        stats = self.stats()
+        total = sum(st.total_ns for st in stats) or 1
+        width = max([len('endpoint')] + [len(st.endpoint) for st in stats])
+        lines = [f"{'endpoint':<{width}}  {'phase':<8}  {'count':>8}  {'total ms':>10}  "
+                 f"{'mean us':>10}  {'max us':>10}  {'share':>6}"]
+        for st in stats:
+            lines.append(f"{st.endpoint:<{width}}  {st.phase:<8}  {st.count:>8}  {st.total_ns / 1e6:>10.3f}  "
+                         f"{st.total_ns / st.count / 1e3:>10.1f}  {st.max_ns / 1e3:>10.1f}  "
+                         f"{st.total_ns * 100 / total:>5.1f}%")
+        return '\n'.join(lines)
+
+    def collapsed(self, root: str = 'eth2') -> str:
+        """
+        The breakdown in collapsed-stack format, one line per endpoint and phase, with the time in microseconds.
+        The path segments of the endpoint become frames. Compatible with flamegraph.pl, speedscope and inferno.
+        """
+        lines = []
+        for st in self.stats():
+            frames = [root] + [seg for seg in st.endpoint.split('/') if seg != ''] + [st.phase]
+            lines.append(f"{';'.join(frames)} {st.total_ns // 1000}")
+        return '\n'.join(lines)
+
+
+class ProfiledEndpointImpl(Eth2EndpointImpl):
+    """
+    Eth2EndpointImpl that counts the time spent resolving routes,
+    and names the endpoints it resolves by their path template.
+    """
+    profiler: Profiler
+    template: str
+
+    def __init__(self, prov: Eth2Provider, path: APIPath, model: Any, profiler: Profiler,
+                 template: Optional[str] = None):
+        super().__init__(prov, path, model)
+        self.profiler = profiler
+        self.template = path if template is None else template
+
+    def _child(self, path: APIPath, model: Any) -> Eth2EndpointImpl:
+        if isinstance(self.model, VariablePathSegmentFn):
+            template = self.template + '/{' + self.model.label + '}'
+        else:
+            template = self.template + path[len(self.path):]
+        return ProfiledEndpointImpl(self.prov, path, model, self.profiler, template)
+
+    def _resolved(self, out: Any, fn: Any, start: int) -> Any:
+        if isinstance(out, ProfiledEndpointImpl):
+            self.profiler.label(out.template, out.template)
+            self.profiler.add(out.template, 'resolve', start)
+        elif isinstance(out, APIEndpointFn):
+            # Requests are counted by the model function, the same for every value of variable path segments.
+            self.profiler.label(fn, self.template + '/' + out.name)
+            self.profiler.add(fn, 'resolve', start)
+        return out
+
+    def __getattr__(self, item):
+        start = perf_counter_ns()
+        out = super().__getattr__(item)
+        return self._resolved(out, getattr(_model_class(self.model), item, None), start)
+
+    def __call__(self, *args, **kwargs):
+        start = perf_counter_ns()
+        fn = getattr(_model_class(self.model), '__call__', None)
+        if isinstance(fn, APIEndpointFn):
+            # A callable route: the call is the request itself.
+            self.profiler.label(fn, self.template)
+        return self._resolved(super().__call__(*args, **kwargs), fn, start)
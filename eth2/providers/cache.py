@@ -0,0 +1,150 @@
+from typing import Optional, Any, Dict, Tuple, Iterator, Sequence
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import time
+import hashlib
+
+from eth2.core import ContentType
+
+CacheKey = Tuple[str, str, str, Optional[str]]
+
+# Endpoints that are typically polled, by path prefix (matching whole path segments).
+# Large one-off responses, like states and full validator lists, are better not kept around.
+DEFAULT_CACHED_PATHS: Tuple[str, ...] = (
+    '/beacon/head',
+    '/beacon/heads',
+    '/beacon/block',
+    '/beacon/block_root',
+    '/beacon/committees',
+    '/beacon/fork',
+    '/consensus/global_votes',
+    '/advanced/fork_choice',
+    '/advanced/operation_pool',
+    '/network/peer_count',
+    '/network/peers',
+    '/eth/v1/beacon/genesis',
+    '/eth/v1/beacon/headers',
+)
+
+
+def cache_key(method: str, path: str, params: Dict[str, Any], accept: Optional[str]) -> CacheKey:
+    return method, path, repr(sorted(params.items())), accept
+
+
+def body_hash(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=32).digest()
+
+
+_fresh_for: ContextVar[Optional[float]] = ContextVar('fresh_for', default=None)
+
+
+@contextmanager
+def fresh_for(seconds: float) -> Iterator[None]:
+    """
+    Responses to requests made within this context (including tasks started within it) stay fresh for the given time:
+    until then, the same request is answered from the cache without contacting the server. Used for prefetching.
+    """
+    token = _fresh_for.set(seconds)
+    try:
+        yield
+    finally:
+        _fresh_for.reset(token)
+
+
+def fresh_until() -> Optional[float]:
+    seconds = _fresh_for.get()
+    return None if seconds is None else time.monotonic() + seconds
+
+
+class CacheEntry(object):
+    # Validators as returned by the server, to make the next request conditional
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # To detect unchanged bodies of servers that do not support validators
+    body_hash: bytes
+    content_type: ContentType
+    value: Any
+    # Monotonic time until which the entry can be used without asking the server, if any
+    expires: Optional[float]
+    # Size of the response body, as measure of the memory the decoded value takes
+    size: int
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str],
+                 body_hash: bytes, content_type: ContentType, value: Any, expires: Optional[float] = None,
+                 size: int = 0):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.content_type = content_type
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+    def is_fresh(self) -> bool:
+        return self.expires is not None and time.monotonic() < self.expires
+
+
+class ResponseCache(object):
+    """
+    Remembers the last decoded response per endpoint and parameters, to make requests conditional:
+    if the server responds with 304 Not Modified, or with the exact same body,
+    the previously decoded response is returned, without decoding it again.
+
+    Only the endpoints matching the cached paths are cached, and the least recently used entries are evicted
+    when there are more than max_entries, or when the response bodies add up to more than max_bytes.
+
+    Note that an unchanged response is the *same* object as before. Copy it before modifying it.
+    """
+    max_entries: int
+    max_bytes: int
+    # Path prefixes of the cached endpoints, or None to cache every GET endpoint
+    paths: Optional[Tuple[str, ...]]
+    _entries: "OrderedDict[CacheKey, CacheEntry]"
+    _bytes: int
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 << 20,
+                 paths: Optional[Sequence[str]] = DEFAULT_CACHED_PATHS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.paths = None if paths is None else tuple(paths)
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def caches(self, path: str) -> bool:
+        """If responses of the endpoint with the given path are cached."""
+        if self.paths is None:
+            return True
+        return any(path == p or path.startswith(p + '/') for p in self.paths)
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, entry: CacheEntry) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        # Responses larger than the whole cache are not kept
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached response bodies"""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
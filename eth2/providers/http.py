@@ -1,16 +1,24 @@
-from typing import Awaitable, cast, Any, TypeVar, Optional
+from typing import Awaitable, cast, Any, TypeVar, Optional, Sequence, Dict, AsyncIterator, AsyncContextManager, Type
+from contextlib import asynccontextmanager
 
 import json
 import dataclasses
 import httpx
+import trio
 import urllib.parse
 
-from remerkleable.core import View
+from remerkleable.complex import List, Vector
 
-from eth2.core import ContentType, APIPath, APIEndpointFn, APIResult, FromObjProtocol, \
+from eth2.core import ContentType, Method, APIPath, APIEndpointFn, APIResult, FromObjProtocol, \
     APIMethodDecorator, APIProviderMethodImpl, Eth2Provider, Eth2EndpointImpl
+from eth2.providers.cache import ResponseCache, CacheEntry, CacheKey, cache_key, body_hash, fresh_until
+from eth2.providers.limiter import AdaptiveLimiter, LimiterStats, Ticket
 
-from eth2.util import ToObjProtocol
+from eth2.util import ToObjProtocol, ObjList, JsonArrayDecoder, EncodedQuery, _json_loader, \
+    encode_json, encode_ssz, payload_bytes
+from eth2.verify import RootVerifier, is_rooted
+from eth2.profiling import Profiler, ProfiledEndpointImpl
+from eth2.models.proposal import Eth2API
 
 
 class Eth2HttpOptions(object):
@@ -18,6 +26,14 @@ class Eth2HttpOptions(object):
     default_req_type: ContentType
     default_resp_type: ContentType
     default_timeout: httpx.Timeout
+    # Opt-in verification of the roots claimed by responses, see eth2.verify
+    root_verifier: Optional[RootVerifier]
+    # Opt-in conditional requests (ETag/Last-Modified) for GET endpoints, see eth2.providers.cache
+    response_cache: Optional[ResponseCache]
+    # Opt-in adaptive concurrency limit, see eth2.providers.limiter
+    limiter: Optional[AdaptiveLimiter]
+    # Opt-in timing of the phases of each request, see eth2.profiling
+    profiler: Optional[Profiler]
 
     def __init__(self,
                  api_base_url: str = 'http://localhost:5052/',
@@ -26,11 +42,19 @@ class Eth2HttpOptions(object):
                  default_timeout: httpx.Timeout = httpx.Timeout(connect_timeout=2.0,
                                                                 read_timeout=2.0,
                                                                 write_timeout=2.0,
-                                                                pool_timeout=2.0)):
+                                                                pool_timeout=2.0),
+                 root_verifier: Optional[RootVerifier] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 limiter: Optional[AdaptiveLimiter] = None,
+                 profiler: Optional[Profiler] = None):
         self.api_base_url = api_base_url
         self.default_req_type = default_req_type
         self.default_resp_type = default_resp_type
         self.default_timeout = default_timeout
+        self.root_verifier = root_verifier
+        self.response_cache = response_cache
+        self.limiter = limiter
+        self.profiler = profiler
 
 
 M = TypeVar('M')
@@ -39,117 +63,369 @@ M = TypeVar('M')
 class Eth2HttpProvider(Eth2Provider):
     options: Eth2HttpOptions
     _client: httpx.AsyncClient
+    # Cached requests that are in flight, see _cached_req
+    _pending: Dict[CacheKey, trio.Event]
 
     def __init__(self, client: httpx.AsyncClient, options: Eth2HttpOptions = Eth2HttpOptions()):
         self.options = options
         self._client = client
+        self._pending = {}
 
-    def api_req(self, end_point: APIPath) -> APIMethodDecorator:  # noqa C901  TODO: split this up
-        api = self
-
-        def entry(fn: APIEndpointFn) -> APIProviderMethodImpl:
-            async def run_req(*args, **kwargs) -> Awaitable[APIResult]:
-                keys = [key for key in fn.arg_keys if key not in kwargs]
+    def _bind_args(self, fn: APIEndpointFn, args: Sequence[Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        keys = [key for key in fn.arg_keys if key not in kwargs]
 
-                # If there are any arguments, they should match the missing arguments.
-                if len(args) != 0 and len(keys) != len(args):
-                    raise Exception(f"unexpected arguments, got {len(args)} args but expected {len(keys)} ({', '.join(keys)})")
+        # If there are any arguments, they should match the missing arguments.
+        if len(args) != 0 and len(keys) != len(args):
+            raise Exception(f"unexpected arguments, got {len(args)} args but expected {len(keys)} ({', '.join(keys)})")
 
-                for key, arg in zip(keys, args):
-                    kwargs[key] = arg
+        for key, arg in zip(keys, args):
+            kwargs[key] = arg
+        return kwargs
 
-                headers = {}
-                if fn.resp_type is not None:
-                    headers['Accept'] = fn.resp_type.value
-                else:
-                    if api.options.default_resp_type in fn.supports:
-                        headers['Accept'] = api.options.default_resp_type.value
-                    # TODO: No Accept header otherwise, or supply all different supported types into Accept?
+    def _accept(self, fn: APIEndpointFn) -> Optional[ContentType]:
+        if fn.resp_type is not None:
+            return fn.resp_type
+        if self.options.default_resp_type in fn.supports:
+            return self.options.default_resp_type
+        # TODO: No Accept header otherwise, or supply all different supported types into Accept?
+        return None
 
-                req_type: ContentType
-                if fn.req_type is not None:
-                    req_type = fn.req_type
+    def _encode_data(self, fn: APIEndpointFn, kwargs: Dict[str, Any], headers: Dict[str, str]) -> Optional[bytes]:
+        """
+        Pops the data argument from the kwargs (if any), and encodes it as request body.
+        Pre-encoded data (bytes, memoryview, or an EncodedQuery) is used as-is.
+        Raw bytes are labeled with the request content type, they must be encoded accordingly.
+        """
+        if fn.data is None:
+            return None
+
+        req_type: ContentType
+        if fn.req_type is not None:
+            req_type = fn.req_type
+        elif self.options.default_req_type in fn.req_supports:
+            req_type = self.options.default_req_type
+        else:
+            req_type = ContentType.json
+
+        data_obj: Any
+        if fn.data in kwargs:
+            data_obj = kwargs.pop(fn.data)
+        else:
+            raise Exception(f"No args or suitable kwarg for data '{fn.data}' key")
+
+        data: bytes
+        if isinstance(data_obj, (bytes, bytearray, memoryview)):
+            data = payload_bytes(data_obj)
+        elif isinstance(data_obj, EncodedQuery):
+            data = data_obj.json_bytes() if req_type == ContentType.json else data_obj.ssz_bytes()
+        elif req_type == ContentType.json:
+            data = encode_json(data_obj)
+        elif req_type == ContentType.ssz:
+            data = encode_ssz(data_obj)
+        else:
+            raise Exception("unknown content type")
+
+        headers['Content-Type'] = req_type.value
+        return data
+
+    async def _send(self, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                    params: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        req_path = urllib.parse.urljoin(self.options.api_base_url, end_point)
+        return await self._client.request(
+            fn.method.value,
+            req_path,
+            data=data,
+            params=params,
+            headers=headers,
+            timeout=self.options.default_timeout,  # TODO: option to change timeout on a function-call level
+        )
+
+    async def _limited_send(self, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                            params: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        limiter = self.options.limiter
+        prof = self.options.profiler
+        if prof is not None:
+            t = prof.now()
+        if limiter is None:
+            resp = await self._send(fn, end_point, data, params, headers)
+            if prof is not None:
+                prof.add(fn, 'http', t)
+            return resp
+        ticket = await limiter.acquire(end_point, fn)
+        if prof is not None:
+            t = prof.add(fn, 'queue', t)
+        ok: Optional[bool] = None
+        try:
+            resp = await self._send(fn, end_point, data, params, headers)
+            ok = resp.status_code < 500 and resp.status_code != 429
+            if prof is not None:
+                prof.add(fn, 'http', t)
+            return resp
+        except httpx.TimeoutException:
+            ok = False
+            raise
+        finally:
+            limiter.release(ticket, ok)
+
+    def limiter_stats(self) -> Optional[LimiterStats]:
+        """The current limit, requests in flight and queue depth of the adaptive limiter, if any."""
+        if self.options.limiter is None:
+            return None
+        return self.options.limiter.stats()
+
+    def _response_content_type(self, fn: APIEndpointFn, resp: httpx.Response) -> ContentType:
+        # Figure out what content type we are reading, with default
+        content_type: ContentType
+        if 'Content-Type' in resp.headers:
+            content_type = ContentType(resp.headers['Content-Type'])
+            if fn.resp_type is not None:
+                if fn.resp_type != content_type:
+                    raise Exception("unsupported content type")
+                content_type = fn.resp_type
+        else:
+            if fn.resp_type is None:
+                content_type = self.options.default_resp_type
+            else:
+                content_type = fn.resp_type
+        if content_type not in fn.supports:
+            raise Exception(f"selected content type '{content_type.value}' is not supported by api function")
+        return content_type
+
+    async def _decode(self, fn: APIEndpointFn, content_type: ContentType, content: bytes) -> APIResult:
+        resp_data: APIResult
+        prof = self.options.profiler
+        if prof is not None:
+            t = prof.now()
+        if content_type == ContentType.ssz:
+            if self.options.root_verifier is not None:
+                resp_data = await self.options.root_verifier.decode_and_verify(fn.typ, content)
+            else:
+                resp_data = fn.typ.decode_bytes(content)
+            if prof is not None:
+                prof.add(fn, 'ssz', t)
+            return resp_data
+        elif content_type == ContentType.json:
+            if fn.typ is None:
+                resp_data = None
+            else:
+                obj = json.loads(content)
+                if prof is not None:
+                    t = prof.add(fn, 'json', t)
+                verifier = self.options.root_verifier
+                if verifier is not None and is_rooted(fn.typ):
+                    # Shares unchanged subtrees with the last response, to not hash the full state again
+                    resp_data = await verifier.from_obj_and_verify(fn.typ, obj)
+                    if prof is not None:
+                        prof.add(fn, 'verify', t)
+                    return resp_data
+                if isinstance(fn.typ, FromObjProtocol):
+                    resp_data = fn.typ.from_obj(obj)
+                elif dataclasses.is_dataclass(fn.typ):
+                    resp_data = fn.typ(**obj)
                 else:
-                    req_type = api.options.default_req_type
-
-                data: Optional[bytes] = None
-                if fn.data is not None:
-                    data_obj: Any
-                    if fn.data in kwargs:
-                        data_obj = kwargs.pop(fn.data)
-                    else:
-                        raise Exception(f"No args or suitable kwarg for data '{fn.data}' key")
-
-                    if req_type == ContentType.json:
-                        if isinstance(data_obj, (ToObjProtocol, View)):
-                            data_obj = data_obj.to_obj()
-                        data = json.dumps(data_obj).encode("utf-8")
-                    elif req_type == ContentType.ssz:
-                        if isinstance(data_obj, View):
-                            data = data_obj.encode_bytes()
-                        else:
-                            raise Exception(f"input {data_obj} is not a SSZ type")
-
-                    headers['Content-Type'] = req_type.value
-
-                req_path = urllib.parse.urljoin(api.options.api_base_url, end_point)
-                resp = await api._client.request(
-                    fn.method.value,
-                    req_path,
-                    data=data,
-                    # Normalize parameters
-                    params={k: (v.to_obj() if isinstance(v, ToObjProtocol) else v)
-                            for k, v in kwargs.items() if v is not None},
-                    headers=headers,
-                    timeout=api.options.default_timeout,  # TODO: option to change timeout on a function-call level
-                )
-                headers['Content-Type'] = req_type.value
-
+                    resp_data = obj
+                if prof is not None:
+                    prof.add(fn, 'from_obj', t)
+            return resp_data
+        else:
+            raise Exception("unknown content type")
+
+    async def _run_req(self, end_point: APIPath, fn: APIEndpointFn,
+                       args: Sequence[Any], kwargs: Dict[str, Any]) -> APIResult:
+        prof = self.options.profiler
+        if prof is not None:
+            t = prof.now()
+            prof.label(fn, end_point)
+
+        kwargs = self._bind_args(fn, args, kwargs)
+
+        headers: Dict[str, str] = {}
+        accept = self._accept(fn)
+        if accept is not None:
+            headers['Accept'] = accept.value
+
+        if prof is not None:
+            t = prof.add(fn, 'bind', t)
+
+        data = self._encode_data(fn, kwargs, headers)
+
+        # Normalize parameters
+        params = {k: (v.to_obj() if isinstance(v, ToObjProtocol) else v) for k, v in kwargs.items() if v is not None}
+
+        if prof is not None:
+            prof.add(fn, 'encode', t)
+
+        # Only plain GET requests are conditional
+        cache = self.options.response_cache
+        if cache is not None and fn.method == Method.GET and data is None and cache.caches(end_point):
+            return await self._cached_req(cache, end_point, fn, params, headers)
+
+        resp = await self._limited_send(fn, end_point, data, params, headers)
+        if resp.status_code != 200:
+            raise Exception(f"request error: {resp.text}")
+        return await self._decode(fn, self._response_content_type(fn, resp), resp.content)
+
+    async def _cached_req(self, cache: ResponseCache, end_point: APIPath, fn: APIEndpointFn,
+                          params: Dict[str, Any], headers: Dict[str, str]) -> APIResult:
+        key = cache_key(fn.method.value, end_point, params, headers.get('Accept'))
+
+        # Wait for the same request if it is already in flight (e.g. a prefetch), its result may be fresh.
+        pending = self._pending.get(key)
+        if pending is not None:
+            await pending.wait()
+
+        entry = cache.get(key)
+        if entry is not None:
+            if entry.is_fresh():
+                return entry.value
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        done = trio.Event()
+        self._pending[key] = done
+        try:
+            resp = await self._limited_send(fn, end_point, None, params, headers)
+            expires = fresh_until()
+
+            if resp.status_code == 304 and entry is not None:
+                if expires is not None:
+                    entry.expires = expires
+                return entry.value
+
+            if resp.status_code != 200:
+                raise Exception(f"request error: {resp.text}")
+
+            content_type = self._response_content_type(fn, resp)
+            content = resp.content
+            content_hash = body_hash(content)
+            # Servers without validators may still repeat the exact same response.
+            if entry is not None and entry.body_hash == content_hash and entry.content_type == content_type:
+                entry.etag = resp.headers.get('ETag')
+                entry.last_modified = resp.headers.get('Last-Modified')
+                if expires is not None:
+                    entry.expires = expires
+                return entry.value
+            resp_data = await self._decode(fn, content_type, content)
+            cache.put(key, CacheEntry(etag=resp.headers.get('ETag'), last_modified=resp.headers.get('Last-Modified'),
+                                      body_hash=content_hash, content_type=content_type, value=resp_data,
+                                      expires=expires, size=len(content)))
+            return resp_data
+        finally:
+            if self._pending.get(key) is done:
+                del self._pending[key]
+            done.set()
+
+    def _stream(self, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                params: Dict[str, Any], headers: Dict[str, str]):
+        req_path = urllib.parse.urljoin(self.options.api_base_url, end_point)
+        return self._client.stream(
+            fn.method.value,
+            req_path,
+            data=data,
+            params=params,
+            headers=headers,
+            timeout=self.options.default_timeout,
+        )
+
+    @asynccontextmanager
+    async def _stream_req(self, end_point: APIPath, fn: APIEndpointFn,
+                          args: Sequence[Any], kwargs: Dict[str, Any]) -> AsyncIterator[AsyncIterator[Any]]:
+        el_typ: Type
+        if isinstance(fn.typ, type) and issubclass(fn.typ, ObjList):
+            el_typ = fn.typ.el_class
+        elif isinstance(fn.typ, type) and issubclass(fn.typ, (List, Vector)):
+            el_typ = fn.typ.element_cls()
+        else:
+            raise Exception(f"cannot stream non-list response type {fn.typ}")
+        if ContentType.json not in fn.supports:
+            raise Exception("streaming requires JSON support")
+
+        prof = self.options.profiler
+        t = 0
+        if prof is not None:
+            t = prof.now()
+            prof.label(fn, end_point)
+
+        kwargs = self._bind_args(fn, args, kwargs)
+        headers: Dict[str, str] = {'Accept': ContentType.json.value}
+        if prof is not None:
+            t = prof.add(fn, 'bind', t)
+        data = self._encode_data(fn, kwargs, headers)
+        params = {k: (v.to_obj() if isinstance(v, ToObjProtocol) else v) for k, v in kwargs.items() if v is not None}
+        if prof is not None:
+            t = prof.add(fn, 'encode', t)
+
+        # A stream holds a limiter ticket while it is open. Its duration depends on the consumer,
+        # so only failures are used to adapt the limit. The ticket is released when the context exits.
+        limiter = self.options.limiter
+        ticket: Optional[Ticket] = None
+        if limiter is not None:
+            ticket = await limiter.acquire(end_point, fn)
+            if prof is not None:
+                t = prof.add(fn, 'queue', t)
+        ok: Optional[bool] = None
+        try:
+            async with self._stream(fn, end_point, data, params, headers) as resp:
                 if resp.status_code != 200:
+                    await resp.aread()
+                    ok = resp.status_code < 500 and resp.status_code != 429
                     raise Exception(f"request error: {resp.text}")
+                elements = self._stream_elements(fn, el_typ, resp, t)
+                try:
+                    yield elements
+                finally:
+                    await elements.aclose()
+        except httpx.TimeoutException:
+            ok = False
+            raise
+        finally:
+            if ticket is not None:
+                limiter.release(ticket, ok)
+
+    async def _stream_elements(self, fn: APIEndpointFn, el_typ: Type, resp: httpx.Response,
+                               t: int) -> AsyncIterator[Any]:
+        if self._response_content_type(fn, resp) != ContentType.json:
+            raise Exception("streaming requires a JSON response")
+        prof = self.options.profiler
+        decoder = JsonArrayDecoder()
+        # Counted per chunk (http, json) and per element (from_obj). Time spent by the consumer is excluded.
+        async for chunk in resp.aiter_bytes():
+            if prof is not None:
+                t = prof.add(fn, 'http', t)
+            objs = decoder.feed(chunk)
+            if prof is not None:
+                t = prof.add(fn, 'json', t)
+            for obj in objs:
+                el = _json_loader(el_typ, obj)
+                if prof is not None:
+                    prof.add(fn, 'from_obj', t)
+                yield el
+                if prof is not None:
+                    t = prof.now()
+        decoder.close()
+
+    def api_req(self, end_point: APIPath) -> APIMethodDecorator:
+        api = self
 
-                # Figure out what content type we are reading, with default
-                content_type: ContentType
-                if 'Content-Type' in resp.headers:
-                    content_type = ContentType(resp.headers['Content-Type'])
-                    if fn.resp_type is not None:
-                        if fn.resp_type != content_type:
-                            raise Exception("unsupported content type")
-                        content_type = fn.resp_type
-                else:
-                    if fn.resp_type is None:
-                        content_type = api.options.default_resp_type
-                    else:
-                        content_type = fn.resp_type
-                if content_type not in fn.supports:
-                    raise Exception(f"selected content type '{content_type.value}' is not supported by api function")
-                # Decode the response
-                resp_data: APIResult
-                if content_type == ContentType.ssz:
-                    resp_data = fn.typ.decode_bytes(resp.content)
-                elif content_type == ContentType.json:
-                    if fn.typ is None:
-                        resp_data = None
-                    elif isinstance(fn.typ, FromObjProtocol):
-                        resp_data = fn.typ.from_obj(resp.json())
-                    elif dataclasses.is_dataclass(fn.typ):
-                        resp_data = fn.typ(**resp.json())
-                    else:
-                        resp_data = resp.json()
-                else:
-                    raise Exception("unknown content type")
-                return resp_data
+        def entry(fn: APIEndpointFn) -> APIProviderMethodImpl:
+            async def run_req(*args, **kwargs) -> Awaitable[APIResult]:
+                return await api._run_req(end_point, fn, args, kwargs)
+
+            def run_stream(*args, **kwargs) -> AsyncContextManager[AsyncIterator[Any]]:
+                return api._stream_req(end_point, fn, args, kwargs)
             # Make a copy, don't modify the original API endpoint.
             wrap_fn = APIEndpointFn(fn)
             wrap_fn.call = run_req
+            wrap_fn.stream_call = run_stream
             return wrap_fn
         return entry
 
-    # TODO: expose standard API
-    # @property
-    # def api(self) -> Eth2API:
-    #     root_endpoint = Eth2EndpointImpl(self, APIPath(''), Eth2API)
-    #     return cast(Eth2API, root_endpoint)
+    @property
+    def api(self) -> Eth2API:
+        """The standard Eth2 API, see eth2.models.proposal"""
+        return self.extended_api(Eth2API)
 
     def extended_api(self, model: M) -> M:
         """
@@ -159,7 +435,11 @@ class Eth2HttpProvider(Eth2Provider):
          Basically anything that can be understood as API model.
         :return: An Eth2EndpointImpl which shadows the model, implementing it by calling HTTP functions.
         """
-        root_endpoint = Eth2EndpointImpl(self, APIPath(''), model)
+        root_endpoint: Eth2EndpointImpl
+        if self.options.profiler is not None:
+            root_endpoint = ProfiledEndpointImpl(self, APIPath(''), model, self.options.profiler)
+        else:
+            root_endpoint = Eth2EndpointImpl(self, APIPath(''), model)
         return cast(model, root_endpoint)
 
 
@@ -179,9 +459,17 @@ class Eth2HttpClient(object):
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self._client.__aexit__(exc_type, exc_val, exc_tb)
 
-    # @property
-    # def api(self) -> Eth2API:
-    #     return self._prov.api
+    @property
+    def api(self) -> Eth2API:
+        return self._prov.api
+
+    def limiter_stats(self) -> Optional[LimiterStats]:
+        return self._prov.limiter_stats()
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        """The profiler of the client, if profiling is enabled. Use profiler.table() or profiler.collapsed()."""
+        return self.options.profiler
 
     def extended_api(self, model: M) -> M:
         return self._prov.extended_api(model)
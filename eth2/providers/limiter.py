@@ -0,0 +1,258 @@
+from typing import Optional, Dict, List, Tuple, Any, Hashable
+
+import heapq
+import itertools
+import trio
+
+# Relative costs of endpoints, by path prefix (matching whole path segments, '*' matches any one segment).
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    # Lighthouse API
+    '/beacon/state': 16.0,
+    '/beacon/validators': 8.0,
+    '/beacon/committees': 4.0,
+    '/consensus/individual_votes': 8.0,
+    '/advanced/fork_choice': 4.0,
+    '/advanced/operation_pool': 4.0,
+    # Standard API, weighted like the Lighthouse equivalents
+    '/eth/v1/debug/beacon/states': 16.0,
+    '/eth/v1/beacon/states/*/validators': 8.0,
+    # A single validator is cheap
+    '/eth/v1/beacon/states/*/validators/*': 1.0,
+    '/eth/v1/beacon/states/*/validator_balances': 8.0,
+    '/eth/v1/beacon/states/*/committees': 4.0,
+}
+
+
+def _matches(key: str, path: str) -> bool:
+    key_segments = key.split('/')
+    path_segments = path.split('/')
+    if len(key_segments) > len(path_segments):
+        return False
+    return all(k == '*' or k == p for k, p in zip(key_segments, path_segments))
+
+
+def _lookup(table: Dict[str, Any], path: str, default: Any) -> Any:
+    best: Optional[str] = None
+    for key in table.keys():
+        if _matches(key, path) and (best is None or len(key) > len(best)):
+            best = key
+    return table[best] if best is not None else default
+
+
+class LimiterStats(object):
+    limit: float
+    in_flight: float
+    queue_depth: int
+
+    def __init__(self, limit: float, in_flight: float, queue_depth: int):
+        self.limit = limit
+        self.in_flight = in_flight
+        self.queue_depth = queue_depth
+
+    def __repr__(self):
+        return f"LimiterStats(limit={self.limit:.1f}, in_flight={self.in_flight:.1f}, queue_depth={self.queue_depth})"
+
+
+class Ticket(object):
+    path: str
+    # The endpoint, to track latencies by. Endpoints with variable path segments are one endpoint, not one per path.
+    key: Hashable
+    weight: float
+    priority: int
+    start: float
+    # If the limit was (nearly) used up when this ticket was granted. Only then is it worth growing the limit.
+    saturated: bool
+    # If less than half of the limit was in use when this ticket was granted: a sample of the unloaded latency.
+    light: bool
+    granted: bool
+    cancelled: bool
+    event: trio.Event
+
+    def __init__(self, path: str, key: Hashable, weight: float, priority: int):
+        self.path = path
+        self.key = key
+        self.weight = weight
+        self.priority = priority
+        self.start = 0.0
+        self.saturated = False
+        self.light = False
+        self.granted = False
+        self.cancelled = False
+        self.event = trio.Event()
+
+
+class EndpointLatency(object):
+    # Moving average of the latency of recent requests
+    short: float
+    # Moving average of the latency of requests sent while the node was lightly loaded, over a longer window
+    long: float
+    samples: int
+    light_samples: int
+
+    def __init__(self):
+        self.short = 0.0
+        self.long = 0.0
+        self.samples = 0
+        self.light_samples = 0
+
+    def add(self, latency: float, light: bool, short_window: int, long_window: int):
+        # Averages of all samples so far, until the windows are full: the first sample is not special.
+        self.samples += 1
+        self.short += (latency - self.short) * max(2 / (short_window + 1), 1 / self.samples)
+        if light:
+            self.light_samples += 1
+            self.long += (latency - self.long) * max(2 / (long_window + 1), 1 / self.light_samples)
+
+
+class AdaptiveLimiter(object):
+    """
+    Limits the total weight of the requests in flight, and adapts the limit to the node (AIMD):
+    the limit grows while requests complete about as fast as usual (per endpoint),
+    and shrinks multiplicatively when they fail (timeouts, 5xx and 429 responses),
+    or when the recent average latency rises well above the usual latency of the unloaded node.
+    Until the first decrease, the limit doubles every round-trip (slow start), after that it grows additively.
+
+    The usual latency is averaged over requests sent while less than half of the limit was in use,
+    so it does not creep up along with latency that rises with the load.
+    Comparing averages, and not single requests, keeps normal latency variance from cutting the limit.
+
+    Waiting requests are queued by priority (higher first), and first-come-first-served within a priority.
+    A request that does not fit waits, even if smaller requests behind it would fit, so heavy requests do not starve.
+    """
+    limit: float
+    min_limit: float
+    max_limit: float
+    increase: float
+    decrease: float
+    tolerance: float
+    short_window: int
+    long_window: int
+    weights: Dict[str, float]
+    priorities: Dict[str, int]
+    in_flight: float
+    _queue: List[Tuple[int, int, Ticket]]
+    _counter: "itertools.count[int]"
+    _latencies: Dict[Hashable, EndpointLatency]
+    _last_decrease: float
+    _slow_start: bool
+
+    def __init__(self,
+                 initial_limit: float = 16.0,
+                 min_limit: float = 1.0,
+                 max_limit: float = 512.0,
+                 increase: float = 1.0,
+                 decrease: float = 0.7,
+                 tolerance: float = 1.5,
+                 short_window: int = 10,
+                 long_window: int = 500,
+                 weights: Optional[Dict[str, float]] = None,
+                 priorities: Optional[Dict[str, int]] = None):
+        """
+        :param initial_limit: the starting limit, in total weight of requests in flight.
+        :param increase: additive increase of the limit, per limit-worth of successful requests, after slow start.
+        :param decrease: multiplicative decrease of the limit, on congestion.
+        :param tolerance: the node is considered congested when the recent average latency of an endpoint
+         is this many times its usual latency.
+        :param short_window: number of requests the recent latency of an endpoint is averaged over.
+        :param long_window: number of lightly loaded requests the usual latency of an endpoint is averaged over.
+        :param weights: relative cost per endpoint path prefix, see DEFAULT_WEIGHTS. Unknown endpoints weigh 1.
+        :param priorities: priority per endpoint path prefix. Unknown endpoints have priority 0.
+        """
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.short_window = short_window
+        self.long_window = long_window
+        self.weights = DEFAULT_WEIGHTS if weights is None else weights
+        self.priorities = {} if priorities is None else priorities
+        self.in_flight = 0.0
+        self._queue = []
+        self._counter = itertools.count()
+        self._latencies = {}
+        self._last_decrease = 0.0
+        self._slow_start = True
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(limit=self.limit, in_flight=self.in_flight,
+                            queue_depth=sum(1 for _, _, t in self._queue if not t.cancelled))
+
+    def _fits(self, ticket: Ticket) -> bool:
+        # Requests heavier than the limit can still run, just on their own.
+        return self.in_flight == 0 or self.in_flight + ticket.weight <= self.limit
+
+    def _grant(self, ticket: Ticket):
+        ticket.light = not ticket.saturated and self.in_flight < self.limit * 0.5
+        self.in_flight += ticket.weight
+        ticket.granted = True
+        ticket.saturated = ticket.saturated or self.in_flight >= self.limit * 0.8
+        ticket.start = trio.current_time()
+        ticket.event.set()
+
+    def _dispatch(self):
+        while len(self._queue) > 0:
+            ticket = self._queue[0][2]
+            if ticket.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if not self._fits(ticket):
+                break
+            heapq.heappop(self._queue)
+            ticket.saturated = True  # it had to wait
+            self._grant(ticket)
+
+    async def acquire(self, path: str, key: Optional[Hashable] = None) -> Ticket:
+        """
+        Wait until the request fits within the limit. Release the ticket when the request completes.
+        :param path: the path of the request, to look up its weight and priority with.
+        :param key: the endpoint, e.g. the API function, to track the latency of. The path if None.
+        """
+        key = path if key is None else key
+        ticket = Ticket(path, key, _lookup(self.weights, path, 1.0), _lookup(self.priorities, path, 0))
+        if len(self._queue) == 0 and self._fits(ticket):
+            self._grant(ticket)
+            return ticket
+        heapq.heappush(self._queue, (-ticket.priority, next(self._counter), ticket))
+        try:
+            await ticket.event.wait()
+        except BaseException:
+            if ticket.granted:
+                self.release(ticket, None)
+            else:
+                ticket.cancelled = True
+            raise
+        return ticket
+
+    def release(self, ticket: Ticket, ok: Optional[bool]):
+        """
+        :param ticket: the ticket, as acquired.
+        :param ok: True if the request succeeded, False if it failed in a way that suggests an overloaded node
+         (timeouts, 5xx and 429 responses), None if the request did not complete (e.g. cancelled).
+        """
+        self.in_flight -= ticket.weight
+        if ok is not None:
+            self._adapt(ticket, ok)
+        self._dispatch()
+
+    def _adapt(self, ticket: Ticket, ok: bool):
+        congested = not ok
+        if ok:
+            stats = self._latencies.get(ticket.key)
+            if stats is None:
+                stats = self._latencies[ticket.key] = EndpointLatency()
+            stats.add(trio.current_time() - ticket.start, ticket.light, self.short_window, self.long_window)
+            # Only a full short window says something about the trend
+            congested = stats.samples >= self.short_window and stats.light_samples > 0 \
+                and stats.short > stats.long * self.tolerance
+        if congested:
+            # Decrease at most once per round-trip: requests started before the last decrease
+            # were sent with the old limit, and do not say anything about the new limit.
+            if ticket.start >= self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self._last_decrease = trio.current_time()
+                self._slow_start = False
+        elif ticket.saturated:
+            step = ticket.weight if self._slow_start else self.increase * ticket.weight / self.limit
+            self.limit = min(self.max_limit, self.limit + step)
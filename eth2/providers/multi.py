@@ -0,0 +1,339 @@
+from enum import Enum, unique
+from typing import Optional, Sequence, List, Dict, Any, Set, Deque
+from collections import deque
+
+import json
+import random
+import httpx
+import trio
+import urllib.parse
+
+from eth2.core import APIPath, APIEndpointFn
+from eth2.providers.http import Eth2HttpOptions, Eth2HttpProvider, Eth2HttpClient
+
+
+@unique
+class NodeSelection(Enum):
+    # Prefer the node with the fewest requests in flight, break ties by latency
+    least_outstanding = 'least_outstanding'
+    # Random choice, weighted by the inverse of the expected latency of the node
+    latency_weighted = 'latency_weighted'
+
+
+class NodeState(object):
+    base_url: str
+    outstanding: int
+    # Exponentially weighted moving average of the request latency, in seconds
+    latency: float
+    head_slot: Optional[int]
+    # Result of the last health check
+    healthy: bool
+    # Time (trio clock) until which the node is ejected after a failed request
+    ejected_until: float
+    # If the last request failed, until a request succeeds or a health check passes
+    failed: bool
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.outstanding = 0
+        self.latency = 0.1
+        self.head_slot = None
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.failed = False
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def __repr__(self):
+        return f"NodeState({self.base_url}, outstanding={self.outstanding}, latency={self.latency:.3f}, " \
+               f"head_slot={self.head_slot}, healthy={self.healthy}, ejected_until={self.ejected_until:.1f})"
+
+
+def _server_error(resp: httpx.Response) -> bool:
+    # Errors of the node rather than of the request, worth trying another node for
+    return resp.status_code >= 500 or resp.status_code == 429
+
+
+class Eth2MultiHttpOptions(Eth2HttpOptions):
+    api_base_urls: List[str]
+    selection: NodeSelection
+    # Fixed delay before sending a hedged duplicate request to another node.
+    # If None, the hedge_percentile of recently observed latencies of the endpoint is used.
+    hedge_delay: Optional[float]
+    hedge_percentile: float
+    # Minimum number of latency samples of an endpoint before requests to it are hedged (when no fixed delay is set)
+    hedge_min_samples: int
+    # Nodes with a head this many slots behind the best node are ejected, until they catch up.
+    max_head_lag: int
+    # Seconds a node is ejected for after a failed request, unless it passes a health check before that.
+    eject_duration: float
+    health_interval: float
+    health_path: str
+
+    def __init__(self,
+                 api_base_urls: Sequence[str] = ('http://localhost:5052/',),
+                 selection: NodeSelection = NodeSelection.least_outstanding,
+                 hedge_delay: Optional[float] = None,
+                 hedge_percentile: float = 0.95,
+                 hedge_min_samples: int = 20,
+                 max_head_lag: int = 2,
+                 eject_duration: float = 10.0,
+                 health_interval: float = 6.0,
+                 health_path: str = 'beacon/head',
+                 **kwargs):
+        super().__init__(api_base_url=api_base_urls[0], **kwargs)
+        self.api_base_urls = list(api_base_urls)
+        self.selection = selection
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_head_lag = max_head_lag
+        self.eject_duration = eject_duration
+        self.health_interval = health_interval
+        self.health_path = health_path
+
+
+class Eth2MultiHttpProvider(Eth2HttpProvider):
+    """
+    Eth2 HTTP provider over a pool of beacon nodes.
+
+    Every request goes to one node, chosen by the selection strategy. If it does not respond within the hedge delay,
+    a duplicate request is sent to another node, and the first response wins. The other request is cancelled.
+    If a node fails, or responds with a server error (5xx) or 429, the request fails over to the next node.
+    Nodes that fail a request, or respond with a 5xx or 429, are ejected for eject_duration seconds,
+    or until they pass a health check. After that, the next request goes to the node to probe it:
+    if it succeeds, the node is back, with its latency estimate reset.
+    Nodes that fail the health check, or whose head lags behind, are ejected until they recover.
+    A passed health check also resets the latency estimate of the node to the latency of the check.
+    """
+    options: Eth2MultiHttpOptions
+    nodes: List[NodeState]
+    # Recent latencies per endpoint, for the hedge delay. Keyed by API function, not by path:
+    # paths with IDs in them are all different, and would never collect enough samples.
+    _samples: Dict[APIEndpointFn, Deque[float]]
+
+    def __init__(self, client: httpx.AsyncClient, options: Eth2MultiHttpOptions = Eth2MultiHttpOptions()):
+        super().__init__(client, options)
+        self.nodes = [NodeState(url) for url in options.api_base_urls]
+        self._samples = {}
+
+    def _candidates(self, exclude: Set[str]) -> List[NodeState]:
+        nodes = [n for n in self.nodes if n.base_url not in exclude]
+        now = trio.current_time()
+        available = [n for n in nodes if n.available(now)]
+        # If everything is unavailable, it is better to try anyway than to fail.
+        return available if len(available) > 0 else nodes
+
+    def _pick(self, exclude: Set[str]) -> Optional[NodeState]:
+        nodes = self._candidates(exclude)
+        if len(nodes) == 0:
+            return None
+        now = trio.current_time()
+        for n in nodes:
+            if n.failed and n.available(now):
+                # Probe the node, once: it stays ejected until the probe succeeds.
+                n.ejected_until = now + self.options.eject_duration
+                return n
+        if self.options.selection == NodeSelection.latency_weighted:
+            weights = [1.0 / (n.latency * (n.outstanding + 1)) for n in nodes]
+            return random.choices(nodes, weights=weights)[0]
+        return min(nodes, key=lambda n: (n.outstanding, n.latency))
+
+    def _hedge_delay(self, fn: APIEndpointFn) -> Optional[float]:
+        if self.options.hedge_delay is not None:
+            return self.options.hedge_delay
+        samples = self._samples.get(fn)
+        if samples is None or len(samples) < self.options.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * self.options.hedge_percentile), len(ordered) - 1)]
+
+    def _record(self, fn: APIEndpointFn, latency: float):
+        samples = self._samples.get(fn)
+        if samples is None:
+            samples = self._samples[fn] = deque(maxlen=100)
+        samples.append(latency)
+
+    def _failed(self, node: NodeState):
+        # A node that fails fast must not look fast: double the expected latency, but no further than the timeout.
+        timeout = self.options.default_timeout.read_timeout
+        cap = max(node.latency, 10.0 if timeout is None else timeout)
+        node.latency = min(2 * node.latency, cap)
+        node.failed = True
+        node.ejected_until = trio.current_time() + self.options.eject_duration
+
+    @staticmethod
+    def _succeeded(node: NodeState, latency: float):
+        if node.failed:
+            # Recovered: the latency before and during the failures says nothing about the node now.
+            node.failed = False
+            node.ejected_until = 0.0
+            node.latency = latency
+        else:
+            node.latency = 0.8 * node.latency + 0.2 * latency
+
+    async def _send_to(self, node: NodeState, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                       params: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        node.outstanding += 1
+        start = trio.current_time()
+        try:
+            resp = await self._client.request(
+                fn.method.value,
+                urllib.parse.urljoin(node.base_url, end_point),
+                data=data,
+                params=params,
+                headers=headers,
+                timeout=self.options.default_timeout,
+            )
+        except trio.Cancelled:
+            # Lost a hedge: the elapsed time is a lower bound of the latency, so it can only raise the estimate.
+            elapsed = trio.current_time() - start
+            if elapsed > node.latency:
+                node.latency = 0.8 * node.latency + 0.2 * elapsed
+            raise
+        except Exception:
+            self._failed(node)
+            raise
+        finally:
+            node.outstanding -= 1
+        if _server_error(resp):
+            self._failed(node)
+            return resp
+        elapsed = trio.current_time() - start
+        self._succeeded(node, elapsed)
+        self._record(fn, elapsed)
+        return resp
+
+    async def _send(self, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                    params: Dict[str, Any], headers: Dict[str, str]) -> httpx.Response:
+        first = self._pick(exclude=set())
+        if first is None:
+            raise Exception("no beacon nodes configured")
+        if len(self._candidates({first.base_url})) == 0:
+            return await self._send_to(first, fn, end_point, data, params, headers)
+        delay = self._hedge_delay(fn)
+
+        tried: Set[str] = set()
+        errors: List[Exception] = []
+        result: Optional[httpx.Response] = None
+        # The last server error response, returned if no node does better
+        failed: Optional[httpx.Response] = None
+
+        async with trio.open_nursery() as nursery:
+            in_flight = 0
+
+            async def attempt(node: NodeState):
+                nonlocal result, failed, in_flight
+                try:
+                    resp = await self._send_to(node, fn, end_point, data, params, headers)
+                    if _server_error(resp):
+                        failed = resp
+                        raise Exception(f"beacon node {node.base_url} responded with status {resp.status_code}")
+                except Exception as e:
+                    errors.append(e)
+                    in_flight -= 1
+                    # Fail over right away, instead of waiting for the hedge delay
+                    if in_flight == 0 and not start_attempt():
+                        nursery.cancel_scope.cancel()
+                    return
+                if result is None:
+                    result = resp
+                    nursery.cancel_scope.cancel()
+
+            def start_attempt() -> bool:
+                nonlocal in_flight
+                node = self._pick(exclude=tried)
+                if node is None or node.base_url in tried:
+                    return False
+                tried.add(node.base_url)
+                in_flight += 1
+                nursery.start_soon(attempt, node)
+                return True
+
+            async def hedge():
+                await trio.sleep(delay)
+                # Only one duplicate: hedging more would add load exactly when nodes are slow.
+                if result is None and len(tried) < 2:
+                    start_attempt()
+
+            tried.add(first.base_url)
+            in_flight += 1
+            nursery.start_soon(attempt, first)
+            if delay is not None:
+                nursery.start_soon(hedge)
+
+        if result is None and failed is None:
+            raise errors[-1]
+        return failed if result is None else result
+
+    def _stream(self, fn: APIEndpointFn, end_point: APIPath, data: Optional[bytes],
+                params: Dict[str, Any], headers: Dict[str, str]):
+        # Streams are not hedged, the first bytes are already consumed by the time a stream could lose.
+        node = self._pick(exclude=set())
+        if node is None:
+            raise Exception("no beacon nodes configured")
+        return self._client.stream(
+            fn.method.value,
+            urllib.parse.urljoin(node.base_url, end_point),
+            data=data,
+            params=params,
+            headers=headers,
+            timeout=self.options.default_timeout,
+        )
+
+    async def _check_node(self, node: NodeState):
+        start = trio.current_time()
+        try:
+            resp = await self._client.get(urllib.parse.urljoin(node.base_url, self.options.health_path),
+                                          headers={'Accept': 'application/json'},
+                                          timeout=self.options.default_timeout)
+            if resp.status_code != 200:
+                raise Exception(f"health check error: {resp.text}")
+            node.head_slot = int(json.loads(resp.content)['slot'])
+        except Exception:
+            node.head_slot = None
+            return
+        # The node is back: forget the penalties of earlier failures.
+        node.latency = trio.current_time() - start
+        node.ejected_until = 0.0
+        node.failed = False
+
+    async def health_check(self):
+        """Check the head of every node, and eject the nodes that are down or lagging behind."""
+        async with trio.open_nursery() as nursery:
+            for node in self.nodes:
+                nursery.start_soon(self._check_node, node)
+        slots = [n.head_slot for n in self.nodes if n.head_slot is not None]
+        best = max(slots) if len(slots) > 0 else None
+        for node in self.nodes:
+            node.healthy = node.head_slot is not None and best - node.head_slot <= self.options.max_head_lag
+
+    async def run_health_checks(self):
+        """Run the health check every health_interval seconds, until cancelled. Run this in a nursery."""
+        while True:
+            await self.health_check()
+            await trio.sleep(self.options.health_interval)
+
+
+class Eth2MultiHttpClient(Eth2HttpClient):
+    options: Eth2MultiHttpOptions
+    _prov: Eth2MultiHttpProvider
+
+    def __init__(self, options: Eth2MultiHttpOptions = Eth2MultiHttpOptions()):
+        super().__init__(options)
+
+    async def __aenter__(self):
+        self._client = await httpx.AsyncClient().__aenter__()
+        self._prov = Eth2MultiHttpProvider(self._client, self.options)
+        return self
+
+    @property
+    def nodes(self) -> List[NodeState]:
+        return self._prov.nodes
+
+    async def health_check(self):
+        await self._prov.health_check()
+
+    async def run_health_checks(self):
+        await self._prov.run_health_checks()
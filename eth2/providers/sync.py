@@ -0,0 +1,220 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Type, TypeVar
+from concurrent.futures import Future, CancelledError
+
+import inspect
+import threading
+import trio
+
+from eth2.core import APIEndpointFn, Eth2EndpointImpl
+from eth2.providers.http import Eth2HttpOptions, Eth2HttpClient
+
+T = TypeVar('T')
+
+
+class Eth2SyncClient(object):
+    """
+    Blocking facade over an Eth2HttpClient, for use from regular (non-trio) threads.
+
+    One background thread runs a trio event loop with a single client. Calls from any thread are scheduled on that loop,
+    so they all share its connection pool, and the response cache, limiter and profiler of the options, if any.
+    Use as a context manager, or call start() and close().
+    Calls still in flight on close() fail with a CancelledError.
+    """
+    options: Eth2HttpOptions
+    client_type: Type[Eth2HttpClient]
+    _client: Optional[Eth2HttpClient]
+    _thread: Optional[threading.Thread]
+    _token: Optional[trio.lowlevel.TrioToken]
+    _nursery: Optional[trio.Nursery]
+    _stop: Optional[trio.Event]
+    _stopping: bool
+
+    def __init__(self, options: Eth2HttpOptions = Eth2HttpOptions(),
+                 client_type: Type[Eth2HttpClient] = Eth2HttpClient):
+        """
+        :param options: the options of the client.
+        :param client_type: the async client to run, e.g. Eth2MultiHttpClient, with matching options.
+        """
+        self.options = options
+        self.client_type = client_type
+        self._client = None
+        self._thread = None
+        self._token = None
+        self._nursery = None
+        self._stop = None
+        self._stopping = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """Start the background thread, and open the client. Blocks until the client is ready."""
+        if self._thread is not None:
+            raise Exception("sync client is already started")
+        ready = threading.Event()
+        errors: List[BaseException] = []
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run_thread, args=(ready, errors),
+                                        name='eth2-sync-client', daemon=True)
+        self._thread.start()
+        ready.wait()
+        if len(errors) > 0:
+            self._thread.join()
+            self._thread = None
+            raise errors[0]
+
+    def _run_thread(self, ready: threading.Event, errors: List[BaseException]):
+        try:
+            trio.run(self._main, ready)
+        except BaseException as e:
+            if not ready.is_set():
+                errors.append(e)
+                ready.set()
+            else:
+                raise
+
+    async def _main(self, ready: threading.Event):
+        async with self.client_type(self.options) as client:
+            async with trio.open_nursery() as nursery:
+                self._client = client
+                self._nursery = nursery
+                self._stop = trio.Event()
+                self._token = trio.lowlevel.current_trio_token()
+                ready.set()
+                await self._stop.wait()
+                nursery.cancel_scope.cancel()
+
+    def close(self):
+        """Cancel the calls in flight, close the client and stop the background thread."""
+        if self._thread is None:
+            return
+        try:
+            self._token.run_sync_soon(self._shutdown)
+        except trio.RunFinishedError:
+            pass
+        self._thread.join()
+        self._thread = None
+        self._token = None
+        self._nursery = None
+        self._client = None
+
+    def _shutdown(self):
+        self._stopping = True
+        self._stop.set()
+
+    @property
+    def client(self) -> Eth2HttpClient:
+        """The async client, e.g. for limiter_stats() or the profiler. Its async methods must be called with submit."""
+        if self._client is None:
+            raise Exception("sync client is not started")
+        return self._client
+
+    async def _call(self, future: Future, fn: Callable[..., Awaitable[T]],
+                    args: Sequence[Any], kwargs: Dict[str, Any]):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+        except BaseException:
+            # Cancelled by close()
+            future.set_exception(CancelledError())
+            raise
+        else:
+            future.set_result(result)
+
+    def submit(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> "Future[T]":
+        """
+        Schedule an async function (e.g. an API endpoint) on the background loop, without waiting for it.
+        Thread-safe. Submit many calls before waiting for the results to run them concurrently.
+        :return: a future of the result.
+        """
+        token = self._token
+        if token is None:
+            raise Exception("sync client is not started")
+        future: Future = Future()
+
+        def spawn():
+            if self._stopping:
+                future.set_exception(CancelledError())
+                return
+            self._nursery.start_soon(self._call, future, fn, args, kwargs)
+
+        try:
+            token.run_sync_soon(spawn)
+        except trio.RunFinishedError:
+            raise Exception("sync client is closed")
+        return future
+
+    def run(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Run an async function (e.g. an API endpoint) on the background loop, and wait for the result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def extended_api(self, model: Any) -> Any:
+        """
+        Like Eth2HttpClient.extended_api, but endpoints are blocking: ``api.beacon.head()`` returns the head.
+        Use ``api.beacon.head.submit()`` to get a future instead.
+        """
+        return SyncEndpointImpl(self, self.client.extended_api(model))
+
+
+class SyncEndpointFn(object):
+    """An API endpoint of a sync client. Calling it blocks until the response is decoded."""
+    sync: Eth2SyncClient
+    fn: APIEndpointFn
+
+    def __init__(self, sync: Eth2SyncClient, fn: APIEndpointFn):
+        self.sync = sync
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.sync.run(self.fn, *args, **kwargs)
+
+    def submit(self, *args, **kwargs) -> Future:
+        return self.sync.submit(self.fn, *args, **kwargs)
+
+
+async def _awaited(aw: Awaitable[T]) -> T:
+    return await aw
+
+
+class SyncEndpointImpl(object):
+    """
+    Shadows an Eth2EndpointImpl, wrapping the endpoints it resolves to as SyncEndpointFn.
+    Routes are resolved in the calling thread, only the requests run on the background loop.
+    Route resolution is counted by the profiler of the client, if any, from those threads: the Profiler is thread-safe.
+    Callable routes block like endpoints, use ``route.submit(...)`` to get a future instead.
+    """
+    sync: Eth2SyncClient
+    impl: Eth2EndpointImpl
+
+    def __init__(self, sync: Eth2SyncClient, impl: Eth2EndpointImpl):
+        self.sync = sync
+        self.impl = impl
+
+    def _wrap(self, out: Any) -> Any:
+        if isinstance(out, APIEndpointFn):
+            return SyncEndpointFn(self.sync, out)
+        if isinstance(out, Eth2EndpointImpl):
+            return SyncEndpointImpl(self.sync, out)
+        return out
+
+    def __getattr__(self, item):
+        return self._wrap(getattr(self.impl, item))
+
+    def __call__(self, *args, **kwargs):
+        out = self.impl(*args, **kwargs)
+        if inspect.isawaitable(out):
+            return self.sync.run(_awaited, out)
+        return self._wrap(out)
+
+    def submit(self, *args, **kwargs) -> Future:
+        out = self.impl(*args, **kwargs)
+        if not inspect.isawaitable(out):
+            raise Exception("not a callable endpoint")
+        return self.sync.submit(_awaited, out)
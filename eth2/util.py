@@ -1,6 +1,10 @@
-from typing import Type, TypeVar, Protocol, runtime_checkable, List, Dict, Union, Tuple
+from typing import Type, TypeVar, Protocol, runtime_checkable, List, Dict, Union, Tuple, Optional
 
-from remerkleable.core import ObjType
+import re
+import json
+import codecs
+
+from remerkleable.core import ObjType, View
 
 
 @runtime_checkable
@@ -8,6 +12,11 @@ class ToObjProtocol(Protocol):
     def to_obj(self) -> ObjType: ...
 
 
+@runtime_checkable
+class EncodeBytesProtocol(Protocol):
+    def encode_bytes(self) -> bytes: ...
+
+
 _T = TypeVar('_T')
 
 
@@ -121,7 +130,24 @@ def _json_loader(t, obj):
         return obj
 
 
-class ObjStruct(object):
+class _ObjStructMeta(type):
+    """
+    Gives every ObjStruct subclass a compact layout: a slot per annotated field, instead of a per-instance dict.
+    Fields with a class-level default value can't be slots, a struct with any of those keeps a dict.
+    """
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        if '__slots__' not in namespace:
+            annotations = namespace.get('__annotations__', {})
+            slots = tuple(k for k in annotations.keys() if k not in namespace)
+            if len(slots) != len(annotations) and not any(b.__dictoffset__ for b in bases):
+                slots += ('__dict__',)
+            namespace['__slots__'] = slots
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+
+class ObjStruct(object, metaclass=_ObjStructMeta):
+    __slots__ = ()
+
     def __init__(self, **kwargs):
         for k, v in kwargs.items():
             setattr(self, k, v)
@@ -139,3 +165,149 @@ class ObjStruct(object):
         if set(ft.keys()) != set(obj.keys()):
             raise Exception("unexpected difference in obj keys")
         return cls(**{k: _json_loader(ft[k], v) for k, v in obj.items()})
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_REST = re.compile(r'[0-9eE.+-]*')
+
+
+class JsonArrayDecoder(object):
+    """
+    Incrementally decodes a JSON array, element by element, as the bytes of the array are fed to it.
+    Elements themselves are decoded by the standard JSON decoder, only the array is split up incrementally.
+    """
+    _buf: str
+    _pos: int
+    _started: bool
+    _done: bool
+    # True after an element, when a separator or the end of the array is expected
+    _after_element: bool
+    # True after a separator, when an element is expected
+    _after_comma: bool
+
+    def __init__(self):
+        self._buf = ''
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._after_element = False
+        self._after_comma = False
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: bytes) -> List[ObjType]:
+        """
+        :param chunk: the next bytes of the JSON array.
+        :return: the elements that were completed by the chunk, possibly none.
+        """
+        self._buf = self._buf[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        out = []
+        buf = self._buf
+        while True:
+            pos = _WHITESPACE.match(buf, self._pos).end()
+            if pos >= len(buf):
+                break
+            c = buf[pos]
+            if not self._started:
+                if c != '[':
+                    raise Exception("expected JSON array")
+                self._started = True
+                self._pos = pos + 1
+                continue
+            if self._done:
+                raise Exception("unexpected data after JSON array")
+            if c == ']':
+                if self._after_comma:
+                    raise Exception("unexpected ']' after ',' in JSON array")
+                self._done = True
+                self._pos = pos + 1
+                continue
+            if c == ',':
+                if not self._after_element:
+                    raise Exception("unexpected ',' in JSON array, expected an element")
+                self._after_element = False
+                self._after_comma = True
+                self._pos = pos + 1
+                continue
+            if self._after_element:
+                raise Exception(f"unexpected '{c}' after JSON array element")
+            decoded = self._element(buf, pos)
+            if decoded is None:
+                break  # Incomplete element, wait for more data
+            obj, end = decoded
+            out.append(obj)
+            self._after_element = True
+            self._after_comma = False
+            self._pos = end
+        return out
+
+    def _element(self, buf: str, pos: int) -> Optional[Tuple[ObjType, int]]:
+        """The element at pos, and the position after it, or None if it is not complete yet."""
+        try:
+            obj, end = self._decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            return None
+        # A complete element is followed by a separator. Otherwise it may be the start of a longer number.
+        after = _WHITESPACE.match(buf, end).end()
+        if after >= len(buf):
+            return None
+        if buf[after] not in ',]':
+            # The rest of a number may not have arrived yet, e.g. '1' of '1.5'
+            if isinstance(obj, (int, float)) and _NUMBER_REST.match(buf, end).end() == len(buf):
+                return None
+            raise Exception(f"unexpected '{buf[after]}' after JSON array element")
+        return obj, end
+
+    def close(self) -> None:
+        if not self._done:
+            raise Exception("unexpected end of JSON array")
+
+
+def encode_json(obj: Union[ObjType, ToObjProtocol, View]) -> bytes:
+    if isinstance(obj, (ToObjProtocol, View)):
+        obj = obj.to_obj()
+    return json.dumps(obj).encode("utf-8")
+
+
+def encode_ssz(obj: EncodeBytesProtocol) -> bytes:
+    if isinstance(obj, EncodeBytesProtocol):
+        return obj.encode_bytes()
+    raise Exception(f"input {obj} is not a SSZ type")
+
+
+class EncodedQuery(object):
+    """
+    A request payload that is encoded once, and then re-used as-is for every request.
+    E.g. a large query of pubkeys that is sent every epoch. Each encoding is computed on first use.
+    """
+    obj: Union[ObjType, ToObjProtocol, EncodeBytesProtocol]
+    _json: Optional[bytes]
+    _ssz: Optional[bytes]
+
+    def __init__(self, obj: Union[ObjType, ToObjProtocol, EncodeBytesProtocol]):
+        self.obj = obj
+        self._json = None
+        self._ssz = None
+
+    def json_bytes(self) -> bytes:
+        if self._json is None:
+            self._json = encode_json(self.obj)
+        return self._json
+
+    def ssz_bytes(self) -> bytes:
+        if self._ssz is None:
+            self._ssz = encode_ssz(self.obj)
+        return self._ssz
+
+
+def payload_bytes(data: Union[bytes, bytearray, memoryview]) -> bytes:
+    """
+    Pre-encoded payloads, as bytes. Bytes, and memoryviews of a complete bytes object, are returned without copying.
+    """
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, memoryview) and isinstance(data.obj, bytes) and data.contiguous and data.nbytes == len(data.obj):
+        return data.obj
+    # Other buffers may change after the call, or are only partially viewed: these need a copy.
+    return bytes(data)
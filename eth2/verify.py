@@ -0,0 +1,196 @@
+from typing import Optional, Tuple, Dict, Type, Any, List as PyList
+
+import threading
+import trio
+
+from remerkleable.core import View, ObjType
+from remerkleable.complex import ComplexView, Container, List, Vector
+from eth2spec.phase0 import spec
+
+from eth2.core import ResponseType
+
+
+def is_rooted(typ: Any) -> bool:
+    """
+    If values of the response type claim a root for their contents:
+    responses like ``APIState`` and ``APIBlock`` are containers of a ``root`` and the rooted value.
+    """
+    if not (isinstance(typ, type) and issubclass(typ, Container)):
+        return False
+    fields = typ.fields()
+    return len(fields) == 2 and 'root' in fields
+
+
+def claimed_root(value: Any) -> Optional[Tuple[spec.Root, View]]:
+    """
+    Find the root that an API response claims for its contents, see ``is_rooted``.
+    Signed values are rooted by their message, e.g. the root of a ``SignedBeaconBlock`` is the block root.
+    :return: the claimed root and the view to check it against, or None if the value does not claim a root.
+    """
+    if not is_rooted(value.__class__):
+        return None
+    fields = value.__class__.fields()
+    content_key = next(k for k in fields.keys() if k != 'root')
+    content = getattr(value, content_key)
+    if isinstance(content, Container) and set(content.__class__.fields().keys()) == {'message', 'signature'}:
+        content = content.message
+    return value.root, content
+
+
+def _offset(data: bytes, i: int) -> int:
+    return int.from_bytes(data[i:i+4], byteorder='little')
+
+
+def _container_spans(typ: Type[Container], data: bytes) -> PyList[Tuple[int, int]]:
+    spans: PyList[Optional[Tuple[int, int]]] = []
+    offsets: PyList[Tuple[int, int]] = []  # (field position, offset)
+    pos = 0
+    for i, ftyp in enumerate(typ.fields().values()):
+        if ftyp.is_fixed_byte_length():
+            size = ftyp.type_byte_length()
+            spans.append((pos, pos + size))
+            pos += size
+        else:
+            spans.append(None)
+            offsets.append((i, _offset(data, pos)))
+            pos += 4
+    for j, (i, start) in enumerate(offsets):
+        end = offsets[j + 1][1] if j + 1 < len(offsets) else len(data)
+        spans[i] = (start, end)
+    return spans
+
+
+def _sequence_spans(elem_typ: Type[View], data: bytes) -> PyList[Tuple[int, int]]:
+    if elem_typ.is_fixed_byte_length():
+        size = elem_typ.type_byte_length()
+        return [(i, i + size) for i in range(0, len(data), size)]
+    if len(data) == 0:
+        return []
+    offsets = [_offset(data, i) for i in range(0, _offset(data, 0), 4)]
+    return [(start, end) for start, end in zip(offsets, offsets[1:] + [len(data)])]
+
+
+def decode_shared(typ: Type[View], data: bytes, prev: Optional[View], prev_data: Optional[bytes]) -> View:
+    """
+    Decode SSZ bytes, sharing every subtree that is byte-for-byte equal with the previous value of the same type.
+    Shared subtrees keep their cached hashes, so consecutive states or blocks only pay for decoding
+    and hashing what changed. Comparisons are on the raw bytes, which is much cheaper than comparing views.
+    """
+    if prev is None or prev_data is None or prev.__class__ != typ:
+        return typ.decode_bytes(data)
+    if data == prev_data:
+        return typ.view_from_backing(prev.get_backing())
+    if issubclass(typ, Container):
+        spans = _container_spans(typ, data)
+        prev_spans = _container_spans(typ, prev_data)
+        return typ(**{
+            fkey: decode_shared(ftyp, data[a:b], getattr(prev, fkey), prev_data[pa:pb])
+            for (fkey, ftyp), (a, b), (pa, pb) in zip(typ.fields().items(), spans, prev_spans)})
+    if issubclass(typ, (List, Vector)) and issubclass(typ.element_cls(), ComplexView):
+        elem_typ = typ.element_cls()
+        spans = _sequence_spans(elem_typ, data)
+        prev_spans = _sequence_spans(elem_typ, prev_data)
+        # The readonly iterator re-uses a single view, only keep the nodes
+        prev_nodes = [el.get_backing() for el in prev.readonly_iter()]
+        elems = []
+        for i, (a, b) in enumerate(spans):
+            if i < len(prev_spans):
+                pa, pb = prev_spans[i]
+                prev_el = elem_typ.view_from_backing(prev_nodes[i])
+                elems.append(decode_shared(elem_typ, data[a:b], prev_el, prev_data[pa:pb]))
+            else:
+                elems.append(elem_typ.decode_bytes(data[a:b]))
+        return typ(elems)
+    return typ.decode_bytes(data)
+
+
+def from_obj_shared(typ: Type[View], obj: ObjType, prev: Optional[View], prev_obj: Optional[ObjType]) -> View:
+    """
+    Like ``decode_shared``, but for the parsed JSON of a value: every subtree with JSON equal to that of the previous
+    value is shared with it, including the cached hashes. Comparing JSON objects is much cheaper than hashing.
+    """
+    if prev is None or prev.__class__ != typ:
+        return typ.from_obj(obj)
+    if obj == prev_obj:
+        return typ.view_from_backing(prev.get_backing())
+    if issubclass(typ, Container) and isinstance(obj, dict) and isinstance(prev_obj, dict) \
+            and set(obj.keys()) == set(typ.fields().keys()):
+        return typ(**{
+            fkey: from_obj_shared(ftyp, obj[fkey], getattr(prev, fkey), prev_obj.get(fkey))
+            for fkey, ftyp in typ.fields().items()})
+    if issubclass(typ, (List, Vector)) and issubclass(typ.element_cls(), ComplexView) \
+            and isinstance(obj, list) and isinstance(prev_obj, list):
+        elem_typ = typ.element_cls()
+        # The readonly iterator re-uses a single view, only keep the nodes
+        prev_nodes = [el.get_backing() for el in prev.readonly_iter()]
+        elems = []
+        for i, el_obj in enumerate(obj):
+            if i < len(prev_nodes) and i < len(prev_obj):
+                prev_el = elem_typ.view_from_backing(prev_nodes[i])
+                elems.append(from_obj_shared(elem_typ, el_obj, prev_el, prev_obj[i]))
+            else:
+                elems.append(elem_typ.from_obj(el_obj))
+        return typ(elems)
+    return typ.from_obj(obj)
+
+
+class RootVerifier(object):
+    """
+    Verifies the roots claimed by API responses, see ``claimed_root``.
+
+    The last response of every rooted type is kept, and the next response of the same type is decoded with
+    ``decode_shared`` (SSZ) or ``from_obj_shared`` (JSON), so only changed subtrees are hashed again.
+    For JSON, that means the parsed JSON of the last state or block is kept in memory too.
+    Decoding and hashing of rooted responses run in a worker thread, to not block the event loop.
+    Other responses are decoded right away.
+    """
+    _last: Dict[ResponseType, Tuple[View, bytes]]
+    _last_json: Dict[ResponseType, Tuple[View, ObjType]]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._last = {}
+        self._last_json = {}
+        self._lock = threading.Lock()
+
+    def verify_sync(self, value: Any) -> None:
+        claim = claimed_root(value)
+        if claim is None:
+            return
+        root, content = claim
+        actual = content.hash_tree_root()
+        if actual != root:
+            raise Exception(f"root mismatch: response claims {root.hex()}, but contents have root {actual.hex()}")
+
+    def decode_and_verify_sync(self, typ: ResponseType, data: bytes) -> View:
+        with self._lock:
+            prev, prev_data = self._last.get(typ, (None, None))
+            value = decode_shared(typ, data, prev, prev_data)
+            self.verify_sync(value)
+            if claimed_root(value) is not None:
+                # A separate view of the same (immutable) tree, unaffected by changes to the returned value
+                self._last[typ] = (typ.view_from_backing(value.get_backing()), data)
+        return value
+
+    def from_obj_and_verify_sync(self, typ: ResponseType, obj: ObjType) -> View:
+        with self._lock:
+            prev, prev_obj = self._last_json.get(typ, (None, None))
+            value = from_obj_shared(typ, obj, prev, prev_obj)
+            self.verify_sync(value)
+            self._last_json[typ] = (typ.view_from_backing(value.get_backing()), obj)
+        return value
+
+    async def verify(self, value: Any) -> None:
+        if claimed_root(value) is None:
+            return
+        await trio.to_thread.run_sync(self.verify_sync, value)
+
+    async def decode_and_verify(self, typ: ResponseType, data: bytes) -> View:
+        """Decode SSZ bytes, and verify the claimed root, if the type has one."""
+        if not is_rooted(typ):
+            return typ.decode_bytes(data)
+        return await trio.to_thread.run_sync(self.decode_and_verify_sync, typ, data)
+
+    async def from_obj_and_verify(self, typ: ResponseType, obj: ObjType) -> View:
+        """Convert parsed JSON of a rooted type (see ``is_rooted``), and verify the claimed root."""
+        return await trio.to_thread.run_sync(self.from_obj_and_verify_sync, typ, obj)
@@ -19,6 +19,7 @@ setup(
     extras_require={
         "testing": ["pytest"],
         "linting": ["flake8"],
+        "analytics": ["numpy>=1.17"],
         "docs": ["sphinx", "sphinx-autodoc-typehints", "pallets_sphinx_themes", "sphinx_issues"]
     },
     install_requires=[
@@ -0,0 +1,145 @@
+import gc
+import json
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Protocol
+
+import pytest
+import trio
+
+from eth2.core import api
+from eth2.util import ObjList
+from eth2.providers.http import Eth2HttpClient, Eth2HttpOptions
+from eth2.providers.limiter import AdaptiveLimiter
+
+NUMBERS = list(range(100000))
+
+
+class NumbersAPI(Protocol):
+
+    @api()
+    async def numbers(self) -> ObjList[int]: ...
+
+
+class ListServer(object):
+    """Serves NUMBERS as JSON list, counting the requests."""
+
+    def __init__(self):
+        self.requests = 0
+        server = self
+        body = json.dumps(NUMBERS).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # The client stopped reading
+                    pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = ListServer()
+    yield srv
+    srv.close()
+
+
+@pytest.fixture
+def unraisable(monkeypatch):
+    """Collects the exceptions that could not be raised, like those of async generators that are not closed."""
+    caught = []
+    monkeypatch.setattr(sys, 'unraisablehook', lambda info: caught.append(info.exc_value))
+    return caught
+
+
+def run(options: Eth2HttpOptions, fn):
+    async def main():
+        async with Eth2HttpClient(options) as client:
+            return await fn(client, client.extended_api(NumbersAPI))
+
+    return trio.run(main)
+
+
+def test_stream_all(server):
+    async def consume(client, numbers_api):
+        async with numbers_api.numbers.stream() as numbers:
+            return [n async for n in numbers]
+
+    assert run(Eth2HttpOptions(api_base_url=server.url), consume) == NUMBERS
+
+
+def test_stream_early_exit(server, unraisable):
+    async def consume(client, numbers_api):
+        out = []
+        for _ in range(3):
+            async with numbers_api.numbers.stream() as numbers:
+                async for n in numbers:
+                    if n == 10:
+                        break
+                    out.append(n)
+        # The client still works after abandoned streams
+        out.append(len(await numbers_api.numbers()))
+        return out
+
+    assert run(Eth2HttpOptions(api_base_url=server.url), consume) == list(range(10)) * 3 + [len(NUMBERS)]
+    gc.collect()
+    assert unraisable == []
+    assert server.requests == 4
+
+
+def test_stream_consumer_error(server, unraisable):
+    async def consume(client, numbers_api):
+        async with numbers_api.numbers.stream() as numbers:
+            async for n in numbers:
+                if n == 5:
+                    raise ValueError("consumer failed")
+
+    with pytest.raises(ValueError):
+        run(Eth2HttpOptions(api_base_url=server.url), consume)
+    gc.collect()
+    assert unraisable == []
+
+
+def test_stream_releases_limiter_ticket(server):
+    limiter = AdaptiveLimiter(initial_limit=4)
+
+    async def consume(client, numbers_api):
+        async with numbers_api.numbers.stream() as numbers:
+            async for n in numbers:
+                assert limiter.in_flight == 1
+                break
+        return limiter.in_flight
+
+    assert run(Eth2HttpOptions(api_base_url=server.url, limiter=limiter), consume) == 0
+    assert limiter.stats().queue_depth == 0
+
+
+def test_stream_error_releases_limiter_ticket(server):
+    limiter = AdaptiveLimiter(initial_limit=4)
+
+    async def consume(client, numbers_api):
+        async with numbers_api.numbers.stream() as numbers:
+            async for n in numbers:
+                raise ValueError("consumer failed")
+
+    with pytest.raises(ValueError):
+        run(Eth2HttpOptions(api_base_url=server.url, limiter=limiter), consume)
+    assert limiter.in_flight == 0
@@ -0,0 +1,96 @@
+import math
+import random
+
+import trio
+import trio.testing
+
+from eth2.providers.limiter import AdaptiveLimiter
+
+
+def simulate(latency, calls: int = 2000, **kwargs):
+    """
+    Run concurrent calls through a limiter, in virtual time.
+    :param latency: the latency of a call, given the limiter (e.g. to depend on the load) and the call number.
+    :return: the limiter, and the virtual time it took to complete all calls.
+    """
+    limiter = AdaptiveLimiter(**kwargs)
+
+    async def call(i: int):
+        ticket = await limiter.acquire('/beacon/head')
+        await trio.sleep(latency(limiter, i))
+        limiter.release(ticket, True)
+
+    async def main():
+        async with trio.open_nursery() as nursery:
+            for i in range(calls):
+                nursery.start_soon(call, i)
+        return trio.current_time()
+
+    duration = trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+    assert limiter.in_flight == 0
+    return limiter, duration
+
+
+def test_idle_lognormal_latency_grows_limit():
+    rng = random.Random(1)
+    limiter, duration = simulate(lambda lim, i: rng.lognormvariate(math.log(0.02), 0.5))
+    assert limiter.limit > 100
+    assert duration < 1.0
+
+
+def test_idle_fast_outliers_grow_limit():
+    rng = random.Random(2)
+    limiter, duration = simulate(lambda lim, i: 0.002 if rng.random() < 0.01 else 0.02)
+    assert limiter.limit > 100
+    assert duration < 1.0
+
+
+def test_latency_rising_with_load_shrinks_limit():
+    # The node handles 8 requests at a time, more requests only queue up on the node.
+    limiter, duration = simulate(lambda lim, i: 0.02 * max(1.0, lim.in_flight / 8), calls=5000)
+    assert 4 <= limiter.limit <= 16
+    # Close to the 400 requests per second the node can do
+    assert duration < 5000 / 400 * 1.1
+
+
+def test_slowdown_shrinks_limit():
+    # After the first 1000 calls, the node can only handle 2 requests at a time.
+    limiter, duration = simulate(lambda lim, i: 0.02 * (1.0 if i < 1000 else max(1.0, lim.in_flight / 2)),
+                                 calls=3000)
+    assert limiter.limit <= 12
+
+
+def test_failures_shrink_limit():
+    limiter = AdaptiveLimiter(initial_limit=16)
+
+    async def main():
+        for _ in range(3):
+            ticket = await limiter.acquire('/beacon/head')
+            await trio.sleep(0.01)
+            limiter.release(ticket, False)
+
+    trio.run(main, clock=trio.testing.MockClock(autojump_threshold=0))
+    assert limiter.limit < 16 * 0.7 ** 2
+
+
+def test_default_weights():
+    limiter = AdaptiveLimiter()
+
+    async def weight(path: str) -> float:
+        ticket = await limiter.acquire(path)
+        limiter.release(ticket, True)
+        return ticket.weight
+
+    async def main():
+        return [await weight(path) for path in [
+            '/beacon/validators/all',
+            '/eth/v1/beacon/states/head/validators',
+            '/eth/v1/beacon/states/0x1234/validator_balances',
+            '/eth/v1/beacon/states/finalized/committees',
+            '/eth/v1/beacon/states/head/validators/123',
+            '/eth/v1/beacon/states/head/fork',
+            '/eth/v1/beacon/states',
+            '/eth/v1/beacon/statesx/head/validators',
+        ]]
+
+    assert trio.run(main) == [8.0, 8.0, 8.0, 4.0, 1.0, 1.0, 1.0, 1.0]
@@ -0,0 +1,196 @@
+import json
+import socket
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httpx
+import pytest
+import trio
+
+from eth2.models import lighthouse
+from eth2.providers.multi import Eth2MultiHttpClient, Eth2MultiHttpOptions
+
+
+class StubNode(object):
+    """A beacon node stub, serving its head slot and a peer count that identifies the node."""
+
+    def __init__(self, peer_count: int, head_slot: int = 100, delay: float = 0.0, status: int = 200, port: int = 0):
+        self.peer_count = peer_count
+        self.head_slot = head_slot
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                time.sleep(stub.delay)
+                if self.path == '/beacon/head':
+                    status, out = 200, {'slot': stub.head_slot}
+                else:
+                    status, out = stub.status, stub.peer_count
+                body = json.dumps(out).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except ConnectionError:
+                    # The client gave up on the request, e.g. a hedged request that lost
+                    pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def count(self, path: str) -> int:
+        return sum(1 for p in self.requests if p == path)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def free_port() -> int:
+    # A port that was just free: connections are refused right away, until a node is started on it
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def dead_url() -> str:
+    return 'http://127.0.0.1:%d/' % free_port()
+
+
+@pytest.fixture
+def nodes():
+    started = []
+
+    def start(*args, **kwargs) -> StubNode:
+        node = StubNode(*args, **kwargs)
+        started.append(node)
+        return node
+
+    yield start
+    for node in started:
+        node.close()
+
+
+def run_calls(options: Eth2MultiHttpOptions, calls: int, health_check: bool = False):
+    async def main():
+        async with Eth2MultiHttpClient(options) as client:
+            if health_check:
+                await client.health_check()
+            api = client.extended_api(lighthouse.Eth2API)
+            return [await api.network.peer_count() for _ in range(calls)], client.nodes
+
+    return trio.run(main)
+
+
+def test_slow_node_is_hedged(nodes):
+    slow = nodes(1, delay=1.0)
+    fast = nodes(2)
+    start = time.monotonic()
+    results, states = run_calls(Eth2MultiHttpOptions(api_base_urls=[slow.url, fast.url], hedge_delay=0.05), 1)
+    assert results == [2]
+    assert time.monotonic() - start < 0.9
+    assert slow.count('/network/peer_count') == 1
+
+
+def test_dead_node_fails_over(nodes):
+    fast = nodes(2)
+    results, states = run_calls(Eth2MultiHttpOptions(api_base_urls=[dead_url(), fast.url]), 30)
+    assert results == [2] * 30
+    assert fast.count('/network/peer_count') == 30
+    assert states[0].ejected_until > 0
+    assert states[0].latency > states[1].latency
+
+
+def test_lagging_node_is_ejected(nodes):
+    lagging = nodes(1, head_slot=90)
+    fast = nodes(2, head_slot=100)
+    options = Eth2MultiHttpOptions(api_base_urls=[lagging.url, fast.url], max_head_lag=2)
+    results, states = run_calls(options, 10, health_check=True)
+    assert results == [2] * 10
+    assert lagging.count('/network/peer_count') == 0
+    assert [n.head_slot for n in states] == [90, 100]
+    assert [n.healthy for n in states] == [False, True]
+
+
+def test_server_error_fails_over(nodes):
+    erroring = nodes(1, status=500)
+    fast = nodes(2)
+    results, states = run_calls(Eth2MultiHttpOptions(api_base_urls=[erroring.url, fast.url]), 10)
+    assert results == [2] * 10
+    assert erroring.count('/network/peer_count') == 1
+    assert states[0].latency > states[1].latency
+
+
+def test_server_errors_everywhere(nodes):
+    first = nodes(1, status=500)
+    second = nodes(2, status=429)
+    with pytest.raises(Exception):
+        run_calls(Eth2MultiHttpOptions(api_base_urls=[first.url, second.url]), 1)
+    assert first.count('/network/peer_count') == 1
+    assert second.count('/network/peer_count') == 1
+
+
+def test_failure_penalty_is_capped(nodes):
+    fast = nodes(2)
+    options = Eth2MultiHttpOptions(api_base_urls=[dead_url(), fast.url], eject_duration=0.0,
+                                   default_timeout=httpx.Timeout(1.0))
+    results, states = run_calls(options, 30)
+    assert results == [2] * 30
+    # Tried every time, as the ejection expires right away, but the latency estimate stays within the timeout
+    assert 0.1 < states[0].latency <= 1.0
+
+
+def test_dead_node_comes_back_after_health_check(nodes):
+    port = free_port()
+    slow = nodes(2, delay=0.05)
+
+    async def main():
+        options = Eth2MultiHttpOptions(api_base_urls=['http://127.0.0.1:%d/' % port, slow.url])
+        async with Eth2MultiHttpClient(options) as client:
+            api = client.extended_api(lighthouse.Eth2API)
+            before = [await api.network.peer_count() for _ in range(5)]
+            node = client.nodes[0]
+            assert node.ejected_until > trio.current_time()
+            nodes(1, port=port)
+            await client.health_check()
+            assert node.ejected_until == 0.0
+            assert node.latency < client.nodes[1].latency
+            after = [await api.network.peer_count() for _ in range(5)]
+            return before, after
+
+    before, after = trio.run(main)
+    assert before == [2] * 5
+    assert after == [1] * 5
+
+
+def test_dead_node_comes_back_after_ejection(nodes):
+    port = free_port()
+    slow = nodes(2, delay=0.05)
+
+    async def main():
+        options = Eth2MultiHttpOptions(api_base_urls=['http://127.0.0.1:%d/' % port, slow.url], eject_duration=0.2)
+        async with Eth2MultiHttpClient(options) as client:
+            api = client.extended_api(lighthouse.Eth2API)
+            before = [await api.network.peer_count() for _ in range(5)]
+            nodes(1, port=port)
+            await trio.sleep(0.2)
+            # Without a health check, the node is tried again once the ejection is over, and wins on latency.
+            after = [await api.network.peer_count() for _ in range(10)]
+            return before, after
+
+    before, after = trio.run(main)
+    assert before == [2] * 5
+    assert after[-5:] == [1] * 5
@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+from eth2.util import JsonArrayDecoder
+
+SAMPLE = [
+    1, -2, 3.5, -0.25, 1e-7, 12345678901234567890, 2E+3,
+    "plain", "comma, inside", "bracket ] inside", "[ nested ] , \" quote", "unicode é中",
+    True, False, None,
+    [], [1, [2, [3]]], {}, {"a": [1, "]"], "b": {"c": ","}},
+]
+
+
+def decode(chunks) -> list:
+    decoder = JsonArrayDecoder()
+    out = []
+    for chunk in chunks:
+        out.extend(decoder.feed(chunk))
+    decoder.close()
+    return out
+
+
+def split_randomly(data: bytes, rng: random.Random) -> list:
+    chunks = []
+    i = 0
+    while i < len(data):
+        n = rng.randint(1, 8)
+        chunks.append(data[i:i + n])
+        i += n
+    return chunks
+
+
+def test_whole():
+    assert decode([json.dumps(SAMPLE).encode()]) == SAMPLE
+
+
+def test_empty():
+    assert decode([b'[]']) == []
+    assert decode([b' [ \n ] ']) == []
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_chunks(seed):
+    rng = random.Random(seed)
+    data = json.dumps(SAMPLE, indent=rng.choice([None, 1])).encode()
+    assert decode(split_randomly(data, rng)) == SAMPLE
+
+
+def test_byte_chunks():
+    # Also splits multi-byte UTF-8 characters
+    data = json.dumps(SAMPLE, ensure_ascii=False).encode()
+    assert decode([data[i:i + 1] for i in range(len(data))]) == SAMPLE
+
+
+def test_numbers_split_across_chunks():
+    assert decode([b'[12', b'34, 1', b'.5, -', b'2e', b'3]']) == [1234, 1.5, -2e3]
+    assert decode([b'[1', b'0', b'0', b']']) == [100]
+
+
+def test_elements_are_emitted_early():
+    decoder = JsonArrayDecoder()
+    assert decoder.feed(b'[{"a": 1}, "b",') == [{"a": 1}, "b"]
+    assert decoder.feed(b' 3') == []
+    assert decoder.feed(b']') == [3]
+    decoder.close()
+
+
+@pytest.mark.parametrize('data', [
+    b'[1,]',
+    b'[,1]',
+    b'[,]',
+    b'[1,,2]',
+    b'[1 2]',
+    b'[1 "a"]',
+    b'["a" "b"]',
+    b'{"a": 1}',
+    b'1',
+    b'[1] 2',
+    b'[1][2]',
+    b'[1',
+    b'[1,',
+    b'',
+    b'[abc]',
+])
+def test_malformed(data):
+    with pytest.raises(Exception):
+        decode([data])
+
+
+@pytest.mark.parametrize('data', [b'[1,]', b'[,1]', b'[1 2]'])
+def test_malformed_in_chunks(data):
+    with pytest.raises(Exception):
+        decode([data[i:i + 1] for i in range(len(data))])
@@ -0,0 +1,101 @@
+import pytest
+import trio
+
+from eth2spec.phase0 import spec
+
+from eth2.models.lighthouse import APIState, HeadInfo
+from eth2.verify import RootVerifier, decode_shared, from_obj_shared, is_rooted
+
+
+def make_state(slot: int, validators: int) -> spec.BeaconState:
+    state = spec.BeaconState(slot=slot)
+    for i in range(validators):
+        state.validators.append(spec.Validator(effective_balance=32 + i, exit_epoch=2**64 - 1))
+        state.balances.append(32 + i)
+    return state
+
+
+def consecutive_states() -> list:
+    states = [make_state(10, 64)]
+    changed = states[-1].copy()
+    changed.slot = 11
+    changed.balances[3] = 1
+    changed.validators[5].slashed = True
+    states.append(changed)
+    # Unchanged
+    states.append(changed.copy())
+    grown = changed.copy()
+    for i in range(10):
+        grown.validators.append(spec.Validator(effective_balance=i))
+        grown.balances.append(i)
+    states.append(grown)
+    shrunk = make_state(12, 40)
+    shrunk.validators[0].slashed = True
+    states.append(shrunk)
+    states.append(make_state(13, 0))
+    return states
+
+
+def test_decode_shared_matches_decode_bytes():
+    prev, prev_data = None, None
+    for state in consecutive_states():
+        data = state.encode_bytes()
+        expected = spec.BeaconState.decode_bytes(data)
+        shared = decode_shared(spec.BeaconState, data, prev, prev_data)
+        assert shared.hash_tree_root() == expected.hash_tree_root() == state.hash_tree_root()
+        assert shared.encode_bytes() == expected.encode_bytes() == data
+        if data == prev_data:
+            assert shared.get_backing() is prev.get_backing()
+        prev, prev_data = shared, data
+
+
+def test_from_obj_shared_matches_from_obj():
+    prev, prev_obj = None, None
+    for state in consecutive_states():
+        obj = state.to_obj()
+        expected = spec.BeaconState.from_obj(obj)
+        shared = from_obj_shared(spec.BeaconState, obj, prev, prev_obj)
+        assert shared.hash_tree_root() == expected.hash_tree_root() == state.hash_tree_root()
+        assert shared.encode_bytes() == expected.encode_bytes() == state.encode_bytes()
+        if obj == prev_obj:
+            assert shared.get_backing() is prev.get_backing()
+        prev, prev_obj = shared, obj
+
+
+def test_is_rooted():
+    assert is_rooted(APIState)
+    assert not is_rooted(HeadInfo)
+    assert not is_rooted(spec.Fork)
+    assert not is_rooted(int)
+    assert not is_rooted(None)
+
+
+@pytest.mark.parametrize('encoding', ['ssz', 'json'])
+def test_root_verifier(encoding):
+    verifier = RootVerifier()
+
+    async def decode(resp: APIState) -> APIState:
+        if encoding == 'ssz':
+            return await verifier.decode_and_verify(APIState, resp.encode_bytes())
+        else:
+            return await verifier.from_obj_and_verify(APIState, resp.to_obj())
+
+    async def main():
+        for state in consecutive_states():
+            resp = APIState(root=state.hash_tree_root(), beacon_state=state)
+            assert (await decode(resp)).hash_tree_root() == resp.hash_tree_root()
+        bad = APIState(root=b'\x01' * 32, beacon_state=consecutive_states()[1])
+        with pytest.raises(Exception):
+            await decode(bad)
+
+    trio.run(main)
+
+
+def test_root_verifier_decodes_unrooted_inline():
+    verifier = RootVerifier()
+    fork = spec.Fork(epoch=3)
+
+    async def main():
+        return await verifier.decode_and_verify(spec.Fork, fork.encode_bytes())
+
+    assert trio.run(main) == fork